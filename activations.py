@@ -0,0 +1,41 @@
+import numpy as np
+
+# Activation functions.
+#
+# Each one takes the pre-activations x and writes the activations to out.
+# out may be x itself, so a forward pass can run in preallocated buffers
+# without creating temporaries. Activations that need room for an
+# intermediate result use scratch, a buffer shaped like x, allocating one
+# only when none is passed.
+
+def sigmoid(x, out, scratch=None):
+    np.negative(x, out=out)
+    np.exp(out, out=out)
+    out += 1
+    np.reciprocal(out, out=out)
+    return out
+
+def fast_sigmoid(x, out, scratch=None):
+    """Sigmoid-shaped x / (1 + |x|) squashed into (0, 1), without an exp."""
+    # The denominator needs its own buffer, out may be x and x is still needed
+    if scratch is None:
+        scratch = np.empty_like(x)
+    np.abs(x, out=scratch)
+    scratch += 1
+    np.divide(x, scratch, out=out)
+    out *= 0.5
+    out += 0.5
+    return out
+
+def tanh(x, out, scratch=None):
+    return np.tanh(x, out=out)
+
+def relu(x, out, scratch=None):
+    return np.maximum(x, 0, out=out)
+
+ACTIVATIONS = {
+    "sigmoid": sigmoid,
+    "fast_sigmoid": fast_sigmoid,
+    "tanh": tanh,
+    "relu": relu,
+}
@@ -0,0 +1,89 @@
+import numpy as np
+from metrics import diversity
+from config import (MUTATION_RATE_RANGE, SUCCESS_TARGET, ADAPT_FACTOR, STAGNATION_GENERATIONS, MIN_DIVERSITY,
+                    POPULATION_RANGE, MAX_POPULATION_GROWTH)
+
+class AdaptiveController:
+    """Adjusts the mutation rate and population size of a GeneticAlgorithm between generations.
+
+    The mutation rate follows the 1/5th success rule: when more than
+    success_target of the children beat the better of their parents, the
+    mutations are paying off and the rate goes up by factor, when fewer do
+    it goes down. It goes up regardless when the best fitness has stalled
+    for stagnation generations or the population has lost its diversity.
+
+    With a target_time, the population is resized so that evaluating a
+    generation takes about that many seconds, from the measured time per
+    bird. It changes by at most max_growth per generation and only by more
+    than a tenth, so a noisy measurement can't make it swing or stall a run.
+    """
+
+    def __init__(self, target_time=None, rate_range=MUTATION_RATE_RANGE, success_target=SUCCESS_TARGET,
+                 factor=ADAPT_FACTOR, stagnation=STAGNATION_GENERATIONS, min_diversity=MIN_DIVERSITY,
+                 population_range=POPULATION_RANGE, max_growth=MAX_POPULATION_GROWTH):
+        self.target_time = target_time
+        self.rate_range = rate_range
+        self.success_target = success_target
+        self.factor = factor
+        self.stagnation = stagnation
+        self.min_diversity = min_diversity
+        self.population_range = population_range
+        self.max_growth = max_growth
+
+        self.best = -np.inf
+        self.stalled = 0
+        self.success_rate = None
+        self.diversity = None
+
+    def mutation_rate(self, genetic_algorithm):
+        """The mutation rate to breed the next generation with."""
+        fitness = genetic_algorithm.fitness
+        rate = genetic_algorithm.mutation_rate
+
+        best = genetic_algorithm.calculate_best_fitness()
+        if best > self.best:
+            self.best, self.stalled = best, 0
+        else:
+            self.stalled += 1
+
+        # Children that did better than both of their parents, elites and immigrants aside
+        self.success_rate = None
+        parents = genetic_algorithm.lineage()
+        parent_fitness = genetic_algorithm.parent_fitness
+        if parents is not None and parent_fitness is not None:
+            bred = (np.arange(len(parents)) >= genetic_algorithm.elite_count) & (parents >= 0).all(axis=1)
+            if bred.any():
+                better = fitness[bred] > parent_fitness[parents[bred]].max(axis=1)
+                self.success_rate = better.mean()
+
+        # Shake things up when progress or variety has run out. Few children
+        # succeed then by definition, so the success rule is skipped rather
+        # than let it cancel the increase.
+        self.diversity = diversity(genetic_algorithm.genomes)
+        if self.stalled >= self.stagnation or self.diversity < self.min_diversity:
+            rate *= self.factor
+            if self.stalled >= self.stagnation:
+                self.stalled = 0
+        elif self.success_rate is not None:
+            if self.success_rate > self.success_target:
+                rate *= self.factor
+            elif self.success_rate < self.success_target:
+                rate /= self.factor
+
+        low, high = self.rate_range
+        return min(max(rate, low), high)
+
+    def population_size(self, population, elapsed):
+        """The population size that fits the time budget, given how long this one took to evaluate."""
+        if self.target_time is None or not elapsed or population == 0:
+            return population
+
+        size = self.target_time / (elapsed / population)
+        size = min(max(size, population / self.max_growth), population * self.max_growth)
+        low, high = self.population_range
+        size = int(min(max(size, low), high))
+
+        # Resizing reallocates every population buffer, so small corrections aren't worth it
+        if abs(size - population) <= population / 10 and low <= population <= high:
+            return population
+        return size
@@ -0,0 +1,92 @@
+import numpy as np
+from activations import ACTIVATIONS
+from config import ACTIVATION, OUTPUT_ACTIVATION, NETWORK_DTYPE
+
+class BatchNetwork:
+    """Evaluates the brains of a whole population with one matrix multiply per layer.
+
+    The weights are kept as contiguous (population, out, in) tensors that are
+    filled from a (population, parameters) genome matrix in the layout of
+    NeuralNetwork.flatten. Every layer writes its activations into a buffer
+    allocated once per population size, so a forward pass allocates nothing.
+    """
+
+    def __init__(self, layer_sizes, genomes, activation=ACTIVATION, output_activation=OUTPUT_ACTIVATION,
+                 dtype=NETWORK_DTYPE):
+        self.layer_sizes = list(layer_sizes)
+        self.dtype = np.dtype(dtype)
+        self.activations = [ACTIVATIONS[activation]] * (len(self.layer_sizes) - 2) + [ACTIVATIONS[output_activation]]
+        self.size = 0
+        self.weights = []
+        self.biases = []
+        self.load(genomes)
+
+    def load(self, genomes):
+        """Copy a genome matrix into the weight tensors, reusing them if the population size is unchanged."""
+        if len(genomes) != self.size:
+            self.size = len(genomes)
+            self.weights = [np.empty((self.size, n_out, n_in), dtype=self.dtype)
+                            for n_in, n_out in zip(self.layer_sizes[:-1], self.layer_sizes[1:])]
+            self.biases = [np.empty((self.size, n_out, 1), dtype=self.dtype) for n_out in self.layer_sizes[1:]]
+            self._allocate_buffers(self.size)
+            self._gathered = None
+
+        offset = 0
+        for w, b in zip(self.weights, self.biases):
+            _, n_out, n_in = w.shape
+            np.copyto(w, genomes[:, offset:offset + n_out * n_in].reshape(w.shape))
+            offset += n_out * n_in
+            np.copyto(b, genomes[:, offset:offset + n_out, None])
+            offset += n_out
+
+    def _allocate_buffers(self, rows):
+        # One (rows, neurons, 1) column buffer per layer, the first one holds the inputs,
+        # and scratch space for activations that need an intermediate result
+        self._buffers = [np.empty((rows, n, 1), dtype=self.dtype) for n in self.layer_sizes]
+        self._scratch = [np.empty((rows, n, 1), dtype=self.dtype) for n in self.layer_sizes[1:]]
+
+    def _gather(self, indices):
+        # Weights of the requested networks, copied into buffers kept for the next call
+        rows = len(indices)
+        if self._gathered is None or len(self._gathered[0][0]) < rows:
+            self._gathered = ([np.empty((rows,) + w.shape[1:], dtype=self.dtype) for w in self.weights],
+                              [np.empty((rows,) + b.shape[1:], dtype=self.dtype) for b in self.biases])
+
+        weights, biases = self._gathered
+        return ([np.take(w, indices, axis=0, out=gw[:rows]) for w, gw in zip(self.weights, weights)],
+                [np.take(b, indices, axis=0, out=gb[:rows]) for b, gb in zip(self.biases, biases)])
+
+    def feedforward(self, inputs, indices=None):
+        """Feed one row of inputs per network and return a (rows, outputs) array.
+
+        If indices is given, row k of inputs is evaluated by network indices[k],
+        otherwise the rows line up with the whole population. The returned
+        array is a view of a buffer that the next call overwrites.
+        """
+        rows = len(inputs)
+        if rows == 0:
+            return np.empty((0, self.layer_sizes[-1]), dtype=self.dtype)
+
+        # Evaluate everyone without gathering when the whole population is requested
+        if indices is not None and len(indices) == self.size:
+            indices = None
+
+        if indices is None:
+            weights, biases = self.weights, self.biases
+        else:
+            weights, biases = self._gather(indices)
+
+        if rows > len(self._buffers[0]):
+            self._allocate_buffers(rows)
+
+        a = self._buffers[0][:rows]
+        np.copyto(a[:, :, 0], inputs)
+
+        for w, b, activation, buffer, scratch in zip(weights, biases, self.activations, self._buffers[1:],
+                                                     self._scratch):
+            out = buffer[:rows]
+            np.matmul(w[:rows], a, out=out)
+            out += b[:rows]
+            a = activation(out, out, scratch[:rows])
+
+        return a[:, :, 0]
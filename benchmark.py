@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+from game import Game
+from genetic_algorithm import GeneticAlgorithm
+from neural_network import NeuralNetwork
+from genome_io import save_genomes, load_genomes
+from rng import RandomStreams
+from world import LAYER_SIZES
+
+DEFAULT_SIZES = [15, 100, 1000, 10000, 100000]
+
+def make_game(size, rng, seed):
+    """Headless game with a random population of the given size."""
+    game = Game(headless=True, streams=RandomStreams(seed))
+    game.set_genomes(rng.standard_normal((size, NeuralNetwork.parameter_count(LAYER_SIZES))), LAYER_SIZES)
+    return game
+
+def timed(function, min_time):
+    """Call function repeatedly for at least min_time seconds and return (calls, elapsed)."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls, elapsed
+
+def bench_simulation(size, rng, min_time, seed):
+    game = make_game(size, rng, seed)
+    bird_steps = 0
+
+    def step():
+        nonlocal bird_steps
+        # Restart the episode whenever everyone has crashed so the population stays busy
+        if game.all_birds_dead():
+            game.reset()
+            game.world.reset_birds()
+        bird_steps += np.count_nonzero(game.world.bird_alive)
+        game.update()
+
+    steps, elapsed = timed(step, min_time)
+    return {"frames_per_sec": steps / elapsed, "bird_steps_per_sec": bird_steps / elapsed}
+
+def bench_inference(size, rng, min_time, seed):
+    game = make_game(size, rng, seed)
+    inputs = rng.random((size, LAYER_SIZES[0]))
+    calls, elapsed = timed(lambda: game.brains.feedforward(inputs), min_time)
+    return {"batches_per_sec": calls / elapsed, "forward_passes_per_sec": calls * size / elapsed}
+
+def bench_evolution(size, rng, min_time, seed):
+    game = make_game(size, rng, seed)
+    genetic_algorithm = GeneticAlgorithm(game)
+    fitness = rng.random(size) * 100
+
+    def evolve():
+        genetic_algorithm.evolve(fitness)
+
+    calls, elapsed = timed(evolve, min_time)
+    return {"generations_per_sec": calls / elapsed, "genomes_per_sec": calls * size / elapsed}
+
+def bench_checkpoint(size, rng, min_time):
+    genomes = rng.standard_normal((size, NeuralNetwork.parameter_count(LAYER_SIZES)))
+    fitness = rng.random(size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "population.bin")
+        saves, save_time = timed(lambda: save_genomes(filename, LAYER_SIZES, genomes, fitness), min_time)
+        megabytes = os.path.getsize(filename) / 1e6
+
+        def load():
+            # Touch every value so the memory-mapped pages are really read
+            _, loaded, loaded_fitness = load_genomes(filename)
+            loaded.sum()
+            loaded_fitness.sum()
+            del loaded, loaded_fitness
+
+        loads, load_time = timed(load, min_time)
+
+    return {"save_mb_per_sec": saves * megabytes / save_time, "load_mb_per_sec": loads * megabytes / load_time}
+
+BENCHMARKS = ["simulation", "inference", "evolution", "checkpoint"]
+
+def run(sizes, benchmarks, seed, min_time):
+    results = {}
+
+    for name in benchmarks:
+        results[name] = {}
+        for size in sizes:
+            # Same seed for every case so runs are comparable
+            rng = np.random.default_rng(seed)
+
+            if name == "simulation":
+                result = bench_simulation(size, rng, min_time, seed)
+            elif name == "inference":
+                result = bench_inference(size, rng, min_time, seed)
+            elif name == "evolution":
+                result = bench_evolution(size, rng, min_time, seed)
+            else:
+                result = bench_checkpoint(size, rng, min_time)
+
+            results[name][str(size)] = result
+            print(f"{name:>10} {size:>7} " + "  ".join(f"{key} {value:,.0f}" for key, value in result.items()))
+
+    return results
+
+def compare(results, baseline, tolerance):
+    """Print each metric relative to a baseline and return the number of regressions."""
+    regressions = 0
+
+    for name, cases in results.items():
+        for size, metrics in cases.items():
+            for key, value in metrics.items():
+                reference = baseline.get(name, {}).get(size, {}).get(key)
+                if not reference:
+                    continue
+
+                ratio = value / reference
+                flag = ""
+                if ratio < 1 - tolerance:
+                    flag = "  REGRESSION"
+                    regressions += 1
+                print(f"{name:>10} {size:>7} {key:<24} {ratio:6.2f}x{flag}")
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark simulation, inference, evolution and checkpoint I/O")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="population sizes to benchmark")
+    parser.add_argument("--only", choices=BENCHMARKS, nargs="+", default=BENCHMARKS, help="benchmarks to run")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to spend on each case")
+    parser.add_argument("--output", metavar="FILE", help="write results as JSON to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against results stored in FILE")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="slowdown relative to the baseline reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.only, args.seed, args.min_time)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"seed": args.seed, "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
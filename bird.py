@@ -1,27 +1,56 @@
-import pygame
 import numpy as np
 from neural_network import NeuralNetwork
-from config import SCREEN_HEIGHT
+from world import array_property, LAYER_SIZES
+from config import SCREEN_HEIGHT, BIRD_X, BIRD_SIZE, GRAVITY, JUMP_FORCE
 
 class Bird:
-    def __init__(self, brain=None):
-        self.x = 100
+    # Simulation state is kept in the game's World arrays once the bird is bound
+    y = array_property("y", "bird_y", float)
+    velocity = array_property("velocity", "bird_velocity", float)
+    alive = array_property("alive", "bird_alive", bool)
+    fitness = array_property("fitness", "bird_fitness", float)
+    
+    def __init__(self, brain=None, copy_brain=True, rng=None):
+        self.world = None
+        self.index = None
+        # Generator for the random brain and mutations; a game hands its birds its mutation stream
+        self.rng = rng
+        self.x = BIRD_X
         self.y = SCREEN_HEIGHT // 2
-        self.width = 30
-        self.height = 30
+        self.width = BIRD_SIZE
+        self.height = BIRD_SIZE
         self.velocity = 0
-        self.gravity = 0.6
-        self.jump_force = -10
+        self.gravity = GRAVITY
+        self.jump_force = JUMP_FORCE
         self.alive = True
         self.fitness = 0
         self.color = (255, 255, 0)  # Yellow
         
         # Create neural network brain
         if brain:
-            self.brain = brain.copy()
+            self.brain = brain.copy() if copy_brain else brain
         else:
-            # Neural network with 4 inputs, 6 hidden neurons, and 1 output
-            self.brain = NeuralNetwork([4, 6, 1])
+            # Neural network with the configured topology
+            self.brain = NeuralNetwork(LAYER_SIZES, rng=rng)
+    
+    @property
+    def brain(self):
+        # Bound birds think with their row of the world's genome matrix
+        if self.world is None:
+            return self._brain
+        return self.world.brain(self.index)
+    
+    @brain.setter
+    def brain(self, brain):
+        if self.world is None:
+            self._brain = brain
+        else:
+            self.world.set_genome(self.index, brain.flatten())
+    
+    def bind(self, world, index):
+        """Read and write this bird's state from slot index of the world's arrays."""
+        self.world = world
+        self.index = index
     
     def update(self, delta_time=1.0):
         # Apply gravity with delta time
@@ -35,6 +64,7 @@ class Bird:
         return self.brain.feedforward(inputs)[0]
     
     def draw(self, screen):
+        import pygame
         pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
         
         # Draw eyes
@@ -47,5 +77,8 @@ class Bird:
             (self.x + self.width, self.y + 20)
         ])
     
-    def mutate(self, rate):
-        self.brain.mutate(rate)
+    def mutate(self, rate, rng=None):
+        brain = self.brain
+        brain.mutate(rate, rng if rng is not None else self.rng)
+        # A bound brain is a view of the world's genomes, storing it again lets the game reload them
+        self.brain = brain
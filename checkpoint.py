@@ -0,0 +1,133 @@
+import os
+import glob
+import queue
+import threading
+from genome_io import save_genomes
+from delta import DELTA_SUFFIX, save_delta, delta_reference_name
+
+class CheckpointWriter:
+    """Writes binary population checkpoints on a background thread.
+
+    The population is snapshotted on the calling thread, so the caller can
+    keep evolving it straight away, and the file is written to a temporary
+    name and renamed into place so a crash never leaves a half-written file.
+    With every set, on_generation also keeps a rotating set of the last
+    keep auto-checkpoints in directory.
+
+    With delta set, auto-checkpoints are written as delta checkpoints that
+    only store what changed since the previous one, with a self-contained
+    keyframe every keyframe_every checkpoints. Rotation then also keeps the
+    older checkpoints the last keep ones are encoded against.
+    """
+
+    def __init__(self, directory="checkpoints", every=0, keep=3, delta=False, keyframe_every=10):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.delta = delta
+        self.keyframe_every = keyframe_every
+        self.queue = queue.Queue()
+
+        # Pick up auto-checkpoints from earlier runs so rotation covers them too
+        self.auto_files = sorted(glob.glob(os.path.join(directory, "generation_*.bin")) +
+                                 glob.glob(os.path.join(directory, "generation_*" + DELTA_SUFFIX)))
+
+        # The last delta checkpoint written, its generation and how many deltas followed its keyframe
+        self.reference = None
+        self.reference_generation = None
+        self.chain_length = 0
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def save(self, genetic_algorithm, filename):
+        """Snapshot the population and write it to filename in the background."""
+        self._submit(genetic_algorithm, filename, None)
+
+    def on_generation(self, generation, genetic_algorithm):
+        """Write an auto-checkpoint if this generation is due for one."""
+        if not self.every or generation % self.every != 0:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = DELTA_SUFFIX if self.delta else ".bin"
+        filename = os.path.join(self.directory, f"generation_{generation:08d}{suffix}")
+        self._submit(genetic_algorithm, filename, generation)
+
+    def _submit(self, genetic_algorithm, filename, generation):
+        # Copies, so the next generation can be bred into the buffers while we write
+        genomes = genetic_algorithm.genomes.copy()
+        fitness = genetic_algorithm.fitness.copy()
+        parents = genetic_algorithm.lineage()
+        if parents is not None:
+            parents = parents.copy()
+        self.queue.put((filename, list(genetic_algorithm.layer_sizes), genomes, fitness, parents, generation))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                print(f"Checkpoint failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write(self, filename, layer_sizes, genomes, fitness, parents, generation):
+        temp_filename = filename + ".tmp"
+        if filename.endswith(DELTA_SUFFIX):
+            self._write_delta(temp_filename, filename, layer_sizes, genomes, fitness, parents, generation)
+        else:
+            save_genomes(temp_filename, layer_sizes, genomes, fitness)
+        os.replace(temp_filename, filename)
+
+        if generation is not None:
+            if filename not in self.auto_files:
+                self.auto_files.append(filename)
+            self._rotate()
+
+    def _write_delta(self, temp_filename, filename, layer_sizes, genomes, fitness, parents, generation):
+        # Checkpoints saved by hand are always self-contained
+        if generation is None:
+            save_delta(temp_filename, layer_sizes, genomes, fitness)
+            return
+
+        reference = self.reference
+        if reference is None or self.chain_length >= self.keyframe_every - 1 \
+                or reference.genomes.shape[1] != genomes.shape[1]:
+            reference = None
+
+        # The lineage points into the previous generation, which is only the reference if it was checkpointed
+        if reference is None or self.reference_generation != generation - 1:
+            parents = None
+
+        self.reference = save_delta(temp_filename, layer_sizes, genomes, fitness, reference, parents)
+        self.reference.filename = filename
+        self.reference_generation = generation
+        self.chain_length = self.chain_length + 1 if reference is not None else 0
+
+    def _rotate(self):
+        # Keep the last keep checkpoints and every checkpoint they are encoded against
+        needed = set(self.auto_files[-self.keep:]) if self.keep > 0 else set()
+        for filename in list(needed):
+            while filename.endswith(DELTA_SUFFIX):
+                reference_name = delta_reference_name(filename)
+                if reference_name is None:
+                    break
+                filename = os.path.join(os.path.dirname(filename), reference_name)
+                needed.add(filename)
+
+        for filename in [f for f in self.auto_files if f not in needed]:
+            self.auto_files.remove(filename)
+            os.remove(filename)
+
+    def flush(self):
+        """Block until every queued checkpoint has been written."""
+        self.queue.join()
+
+    def close(self):
+        """Write the remaining checkpoints and stop the background thread."""
+        self.queue.put(None)
+        self.thread.join()
@@ -6,6 +6,61 @@ SCREEN_HEIGHT = 600
 # Pipe settings
 PIPE_GAP = 150
 PIPE_FREQUENCY = 50  # New pipe every N frames
+PIPE_WIDTH = 60
+PIPE_SPEED = 5
 
 # Bird settings
 BIRD_COUNT = 15      # Number of birds in population
+BIRD_X = 100
+BIRD_SIZE = 30
+GRAVITY = 0.6
+JUMP_FORCE = -10
+
+# Sensor settings
+SENSORS = ["y", "pipe_x", "gap_top", "gap_bottom"]  # Network inputs, also: velocity, gap_center
+SENSOR_LOOKAHEAD = 1                                # Pipes ahead that pipe sensors (pipe_x, gap_*) see
+
+# Brain settings
+HIDDEN_LAYERS = [6]            # Neurons per hidden layer, the input layer follows from the sensors
+ACTIVATION = "sigmoid"         # Hidden layer activation: sigmoid, fast_sigmoid, tanh or relu
+OUTPUT_ACTIVATION = "sigmoid"  # Output activation, the bird jumps when the output is above 0.5
+NETWORK_DTYPE = "float64"      # float32 halves the memory traffic of batched inference
+
+# Evolution settings
+SELECTION = "tournament"  # Parent selection: roulette, sus, tournament or rank
+ELITE_COUNT = 1           # Best birds copied unchanged into the next generation
+
+# Adaptive evolution settings
+MUTATION_RATE_RANGE = (0.01, 0.5)  # Bounds of the adapted mutation rate
+SUCCESS_TARGET = 0.2               # Share of children beating their parents the rate is steered to (1/5th rule)
+ADAPT_FACTOR = 1.2                 # Factor the mutation rate changes by per generation
+STAGNATION_GENERATIONS = 10        # Generations without a new best fitness before mutating more
+MIN_DIVERSITY = 0.1                # Mutate more when the genomes' spread falls below this
+POPULATION_RANGE = (10, 100000)    # Bounds of the population size fitted to the time budget
+MAX_POPULATION_GROWTH = 2.0        # Most the population grows or shrinks by per generation
+
+# Evaluation settings
+EPISODE_AGGREGATE = "mean"  # How the fitness of several episodes is combined: mean, min or quantile
+EPISODE_QUANTILE = 0.25     # Quantile used by the "quantile" aggregate
+FITNESS_CACHE_MB = 64       # Memory bound of the fitness cache, when enabled
+
+# Saved population files
+POPULATION_FILE = "population.bin"          # Binary checkpoint written by Save
+LEGACY_POPULATION_FILE = "population.json"  # JSON export, still loaded if no checkpoint exists
+
+# Course settings
+COURSE_LENGTH = 256      # Pipes precomputed per course, extended on demand
+COURSE_CACHE_SIZE = 64   # Courses kept in the in-process cache
+
+# Replay settings
+REPLAY_BIRDS = 3            # Best birds recorded per replayed generation
+REPLAY_MAX_FRAMES = 20000   # Longest recorded episode when the training run sets no frame limit
+REPLAY_KEYFRAMES = 600      # Frames between the snapshots playback seeks from
+
+# Metrics settings
+ALIVE_CURVE_INTERVAL = 50  # Frames between samples of the number of living birds
+
+# Render settings
+RENDER_FPS = 60          # Most frames drawn per second
+RENDER_EVERY = 1         # Draw the game area every Nth generation
+MAX_DRAWN_BIRDS = 100    # Living birds drawn per frame
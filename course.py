@@ -0,0 +1,58 @@
+import numpy as np
+from functools import lru_cache
+from multiprocessing import shared_memory
+from config import SCREEN_HEIGHT, PIPE_GAP, COURSE_CACHE_SIZE
+
+@lru_cache(maxsize=COURSE_CACHE_SIZE)
+def generate_course(seed, length):
+    """Gap positions of the first length pipes of the course with this seed.
+
+    Courses are cached by (seed, length), so generations and episodes that
+    fly the same course share one read-only array instead of regenerating it.
+    """
+    rng = np.random.default_rng(seed)
+    gaps = rng.integers(100, SCREEN_HEIGHT - 100 - PIPE_GAP, length, endpoint=True)
+    gaps.flags.writeable = False
+    return gaps
+
+class SharedCourses:
+    """A set of courses published in shared memory for worker processes.
+
+    The parent generates every course once; workers read them with
+    load_shared_course instead of generating their own copy.
+    """
+
+    def __init__(self, seeds, length):
+        self.seeds = list(seeds)
+        self.length = length
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, len(self.seeds) * length * 8))
+
+        courses = np.ndarray((len(self.seeds), length), dtype=np.int64, buffer=self.memory.buf)
+        for i, seed in enumerate(self.seeds):
+            courses[i] = generate_course(seed, length)
+        del courses
+
+    def handle(self, seed):
+        """Small picklable reference to one course for load_shared_course."""
+        return (self.memory.name, self.seeds.index(seed), self.length, seed)
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def load_shared_course(handle):
+    """Read a course published by SharedCourses and return (seed, gaps)."""
+    name, index, length, seed = handle
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        # Copy out the row so the shared block can be closed straight away
+        gaps = np.ndarray((length,), dtype=np.int64, buffer=memory.buf, offset=index * length * 8).copy()
+    finally:
+        memory.close()
+    return seed, gaps
@@ -0,0 +1,202 @@
+import os
+import struct
+import hashlib
+import numpy as np
+from neural_network import NeuralNetwork
+from genome_io import CHECKPOINT_DTYPES
+
+# Delta checkpoint layout:
+#   magic, version, dtype code, population size, layer count,
+#   reference name length, mixed rows, literals, raw rows      (DELTA_HEADER)
+#   layer sizes                                                (uint32 each)
+#   file name of the reference checkpoint, empty for none      (utf-8)
+#   fitness                                                    (float64, one per bird)
+#   row kind, first and second row argument                    (uint8, int32, int32, one per bird)
+#   parameter codes of mixed rows, 2 bits per parameter        (uint8, mixed rows x ceil(parameters / 4))
+#   literal parameter values of mixed rows, in row order       (dtype)
+#   raw rows                                                   (dtype, raw rows x parameters)
+#
+# Every row is stored as one of:
+#   COPY  identical to row a of the reference checkpoint
+#   DUP   identical to row a of this checkpoint
+#   MIX   each parameter taken from reference row a (code 0) or b (code 1),
+#         or stored as a literal (code 2), which is how crossover and
+#         mutation build children from their parents
+#   RAW   stored in full
+# Rows are matched by content hash, so elites and clones cost no weights at all.
+DELTA_SUFFIX = ".gfd"
+DELTA_MAGIC = b"GFBD"
+DELTA_VERSION = 1
+DELTA_HEADER = struct.Struct("<4sIIQIIQQQ")
+
+COPY, DUP, MIX, RAW = 0, 1, 2, 3
+
+# Rows with more literals than this are cheaper to store raw
+MAX_LITERAL_FRACTION = 0.5
+
+def row_hashes(genomes):
+    """64-bit content hash of every row."""
+    return [hashlib.blake2b(row.tobytes(), digest_size=8).digest() for row in genomes]
+
+class DeltaReference:
+    """A checkpoint later ones can be encoded against: its file name, its stored rows and their hashes."""
+
+    def __init__(self, filename, genomes, hashes=None):
+        self.filename = filename
+        self.genomes = genomes
+        self.hashes = hashes if hashes is not None else row_hashes(genomes)
+        self.index = {}
+        for row, digest in enumerate(self.hashes):
+            self.index.setdefault(digest, row)
+
+def save_delta(filename, layer_sizes, genomes, fitness, reference=None, parents=None, dtype=np.float32):
+    """Write genomes as a delta checkpoint and return a DeltaReference to encode the next one against.
+
+    reference is the DeltaReference of an earlier checkpoint in the same
+    directory. parents is an optional (birds, 2) array with the reference rows
+    each bird was bred from, e.g. GeneticAlgorithm.parents when reference is
+    the previous generation; without it only exact copies are found.
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    dtype_codes = {d: code for code, d in CHECKPOINT_DTYPES.items()}
+    if dtype not in dtype_codes:
+        raise ValueError(f"Checkpoints can only store float32 or float64 weights, not {dtype}")
+
+    stored = np.ascontiguousarray(genomes, dtype=dtype)
+    population, parameters = stored.shape
+    hashes = row_hashes(stored)
+
+    kinds = np.full(population, RAW, dtype="<u1")
+    first = np.zeros(population, dtype="<i4")
+    second = np.zeros(population, dtype="<i4")
+
+    # Identical rows, within this checkpoint and against the reference
+    seen = {}
+    for row, digest in enumerate(hashes):
+        if digest in seen and np.array_equal(stored[seen[digest]], stored[row]):
+            kinds[row], first[row] = DUP, seen[digest]
+            continue
+        seen.setdefault(digest, row)
+        if reference is not None and digest in reference.index \
+                and np.array_equal(reference.genomes[reference.index[digest]], stored[row]):
+            kinds[row], first[row] = COPY, reference.index[digest]
+
+    # Children described by which parent each parameter came from
+    codes = np.empty((0, parameters), dtype=np.uint8)
+    if reference is not None and parents is not None:
+        parents = np.asarray(parents)
+        rows = np.flatnonzero((kinds == RAW) & (parents >= 0).all(axis=1) & (parents < len(reference.genomes)).all(axis=1))
+        codes = np.full((len(rows), parameters), 2, dtype=np.uint8)
+        codes[stored[rows] == reference.genomes[parents[rows, 1]]] = 1
+        codes[stored[rows] == reference.genomes[parents[rows, 0]]] = 0
+
+        mixed = (codes == 2).mean(axis=1) <= MAX_LITERAL_FRACTION
+        rows, codes = rows[mixed], codes[mixed]
+        kinds[rows] = MIX
+        first[rows], second[rows] = parents[rows, 0], parents[rows, 1]
+
+    mix_rows = np.flatnonzero(kinds == MIX)
+    raw_rows = np.flatnonzero(kinds == RAW)
+    literals = stored[mix_rows][codes == 2]
+    packed = np.packbits(np.stack([codes >> 1, codes & 1], axis=-1).reshape(len(codes), 2 * parameters), axis=1)
+
+    reference_name = os.path.basename(reference.filename).encode() if reference is not None else b""
+    with open(filename, 'wb') as f:
+        f.write(DELTA_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, dtype_codes[dtype], population, len(layer_sizes),
+                                  len(reference_name), len(mix_rows), len(literals), len(raw_rows)))
+        f.write(np.asarray(layer_sizes, dtype="<u4").tobytes())
+        f.write(reference_name)
+        f.write(np.asarray(fitness, dtype="<f8").tobytes())
+        f.write(kinds.tobytes())
+        f.write(first.tobytes())
+        f.write(second.tobytes())
+        f.write(packed.tobytes())
+        f.write(literals.tobytes())
+        f.write(stored[raw_rows].tobytes())
+
+    return DeltaReference(filename, stored, hashes)
+
+def delta_reference_name(filename):
+    """File name of the checkpoint a delta checkpoint refers to, None for a self-contained one."""
+    with open(filename, 'rb') as f:
+        header = DELTA_HEADER.unpack(f.read(DELTA_HEADER.size))
+        f.seek(4 * header[4], os.SEEK_CUR)
+        name = f.read(header[5]).decode()
+    return name or None
+
+def load_delta(filename, reference=None):
+    """Decode a delta checkpoint and return (layer_sizes, genomes, fitness).
+
+    The checkpoints it refers to are loaded first, from the same directory,
+    unless the already decoded genomes of the reference are passed in.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+
+    (magic, version, dtype_code, population, layer_count,
+     name_length, mix_count, literal_count, raw_count) = DELTA_HEADER.unpack_from(data)
+    if magic != DELTA_MAGIC:
+        raise ValueError(f"{filename} is not a delta checkpoint")
+    if version != DELTA_VERSION:
+        raise ValueError(f"Unsupported delta checkpoint version {version}")
+    dtype = CHECKPOINT_DTYPES[dtype_code]
+
+    offset = DELTA_HEADER.size
+
+    def read(count, item_dtype):
+        nonlocal offset
+        values = np.frombuffer(data, dtype=item_dtype, count=count, offset=offset)
+        offset += values.nbytes
+        return values
+
+    layer_sizes = read(layer_count, "<u4").tolist()
+    reference_name = data[offset:offset + name_length].decode()
+    offset += name_length
+    parameters = NeuralNetwork.parameter_count(layer_sizes)
+
+    fitness = read(population, "<f8").copy()
+    kinds = read(population, "<u1")
+    first = read(population, "<i4")
+    second = read(population, "<i4")
+    packed = read(mix_count * ((2 * parameters + 7) // 8), np.uint8).reshape(mix_count, (2 * parameters + 7) // 8)
+    literals = read(literal_count, dtype)
+    raw = read(raw_count * parameters, dtype).reshape(raw_count, parameters)
+
+    if reference_name and reference is None:
+        _, reference, _ = load_delta(os.path.join(os.path.dirname(filename), reference_name))
+
+    genomes = np.empty((population, parameters), dtype=dtype)
+    genomes[kinds == RAW] = raw
+
+    copies = np.flatnonzero(kinds == COPY)
+    if len(copies):
+        genomes[copies] = reference[first[copies]]
+
+    mix_rows = np.flatnonzero(kinds == MIX)
+    if len(mix_rows):
+        bits = np.unpackbits(packed, axis=1, count=2 * parameters).reshape(mix_count, parameters, 2)
+        codes = bits[:, :, 0] * 2 + bits[:, :, 1]
+        mixed = np.where(codes == 0, reference[first[mix_rows]], reference[second[mix_rows]])
+        mixed[codes == 2] = literals
+        genomes[mix_rows] = mixed
+
+    # Duplicates always point at an earlier row that is not a duplicate itself
+    duplicates = kinds == DUP
+    genomes[duplicates] = genomes[first[duplicates]]
+
+    return layer_sizes, genomes, fitness
+
+def load_delta_history(filenames):
+    """Lazily decode a sequence of delta checkpoints, each usually referring to the one before.
+
+    Yields (filename, layer_sizes, genomes, fitness), reusing the previous
+    decoded population as the reference where possible, so a whole history
+    is read in one pass.
+    """
+    previous_name, previous = None, None
+    for filename in filenames:
+        reference_name = delta_reference_name(filename)
+        reference = previous if reference_name is not None and reference_name == previous_name else None
+        layer_sizes, genomes, fitness = load_delta(filename, reference)
+        yield filename, layer_sizes, genomes, fitness
+        previous_name, previous = os.path.basename(filename), genomes
@@ -0,0 +1,95 @@
+import numpy as np
+from game import Game
+from course import generate_course
+from scheduler import EpisodeScheduler
+from config import COURSE_LENGTH, EPISODE_AGGREGATE, EPISODE_QUANTILE
+
+AGGREGATES = ("mean", "min", "quantile")
+
+def aggregate_fitness(fitness, aggregate=EPISODE_AGGREGATE, quantile=EPISODE_QUANTILE):
+    """Combine an (episodes, genomes) fitness matrix into one score per genome.
+
+    The mean rewards good average play, min rewards never crashing early and
+    a low quantile sits in between while ignoring the single unluckiest course.
+    """
+    if aggregate == "mean":
+        return fitness.mean(axis=0)
+    if aggregate == "min":
+        return fitness.min(axis=0)
+    if aggregate == "quantile":
+        return np.quantile(fitness, quantile, axis=0)
+    raise ValueError(f"Unknown fitness aggregate: {aggregate}")
+
+def evaluate_episodes(game, genomes, layer_sizes, courses, scheduler, ghosts=None, trajectory=None):
+    """Fly every genome through every course and return an (episodes, genomes) fitness matrix.
+
+    courses is a list of (seed, gaps) pairs. The population is repeated once
+    per course, each copy in its own lane of the world, so all episodes run
+    as one batched episode rather than one after the other. ghosts is the
+    known final fitness of birds left out of the population, one array per
+    course, so the episodes end as if they had been flown too. trajectory
+    is handed on to EpisodeScheduler.run.
+    """
+    episodes = len(courses)
+    seeds, gaps = zip(*courses)
+    game.reset(list(seeds), list(gaps))
+    if len(genomes) == 0:
+        return np.empty((episodes, 0))
+
+    game.set_genomes(np.tile(genomes, (episodes, 1)), layer_sizes)
+    game.world.bird_lane[:] = np.repeat(np.arange(episodes), len(genomes))
+    game.world.set_ghosts(ghosts)
+
+    scheduler.run(game, trajectory)
+    return game.world.bird_fitness.reshape(episodes, len(genomes))
+
+class BatchedEvaluator:
+    """Evaluates a population on several courses at once in this process.
+
+    Has the same interface as ParallelEvaluator, which spreads the same
+    batched evaluation over worker processes. With a FitnessCache, genomes
+    that already flew these courses aren't flown again. Pass the Stats of
+    the training game to have the simulation timed and counted in it. After
+    evaluate, steps, score and alive_curve describe the batched episode as
+    they would for a game.
+    """
+
+    def __init__(self, episodes=1, scheduler=None, aggregate=EPISODE_AGGREGATE, quantile=EPISODE_QUANTILE,
+                 cache=None, stats=None):
+        self.episodes = episodes
+        self.scheduler = scheduler or EpisodeScheduler()
+        self.aggregate = aggregate
+        self.quantile = quantile
+        self.cache = cache
+        self.game = Game(headless=True)
+        if stats is not None:
+            self.game.stats = stats
+
+        # The last evaluation's frames simulated, pipes passed and living birds over time
+        self.steps = None
+        self.score = None
+        self.alive_curve = None
+
+    def evaluate(self, genomes, layer_sizes, course_seeds):
+        """Return the fitness of every genome, aggregated over one episode per course seed."""
+        courses = [(seed, generate_course(seed, COURSE_LENGTH)) for seed in course_seeds]
+        if self.cache is None:
+            fitness = evaluate_episodes(self.game, genomes, layer_sizes, courses, self.scheduler)
+        else:
+            hashes, known, missing, ghosts = self.cache.split(genomes, course_seeds, self.scheduler.top_k)
+            flown = evaluate_episodes(self.game, genomes[missing], layer_sizes, courses, self.scheduler, ghosts)
+            fitness = self.cache.merge(hashes, known, missing, course_seeds, flown, self.scheduler.fitness_cap)
+
+        self.steps = self.game.frame_counter
+        self.score = self.game.score
+        self.alive_curve = self.game.alive_curve
+        return aggregate_fitness(fitness, self.aggregate, self.quantile)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
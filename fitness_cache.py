@@ -0,0 +1,98 @@
+from collections import OrderedDict
+import numpy as np
+from delta import row_hashes
+from config import FITNESS_CACHE_MB
+
+# Approximate memory taken by one entry: key tuple, hash bytes, seed, fitness and dict slot
+ENTRY_BYTES = 256
+
+class FitnessCache:
+    """Remembers the fitness genomes earned on courses they have already flown.
+
+    The simulation is deterministic, so a genome flying the same course again
+    earns the same fitness; elites and unmutated children of a fixed course
+    need not be flown again. Entries are keyed by a hash of the genome and the
+    course seed, and the least recently used ones are dropped once the cache
+    would take more than max_mb megabytes.
+
+    Only final fitness is kept. A bird still flying when the scheduler ended
+    its episode could have earned more in another one, so it is flown again.
+    All lookups are assumed to use the same brains and EpisodeScheduler, as
+    they do within one training run.
+    """
+
+    def __init__(self, max_mb=FITNESS_CACHE_MB):
+        # hits and misses count genomes, a hit is a genome that didn't have to be flown
+        self.max_entries = max(1, int(max_mb * 2**20) // ENTRY_BYTES)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, genomes, course_seeds):
+        """Return the genome hashes and an (episodes, genomes) fitness matrix, NaN where not cached."""
+        hashes = row_hashes(np.ascontiguousarray(genomes))
+        fitness = np.full((len(course_seeds), len(genomes)), np.nan)
+
+        for episode, seed in enumerate(course_seeds):
+            for row, digest in enumerate(hashes):
+                key = (digest, seed)
+                cached = self.entries.get(key)
+                if cached is not None:
+                    self.entries.move_to_end(key)
+                    fitness[episode, row] = cached
+        return hashes, fitness
+
+    def store(self, hashes, course_seeds, fitness, fitness_cap=None):
+        """Remember the final fitness of genomes that were flown together, as an (episodes, genomes) matrix.
+
+        Birds flying together have the same fitness and always stay ahead of
+        the crashed ones, so birds with the highest fitness of their episode
+        below the cap may have been cut short; everyone else crashed or hit
+        the cap.
+        """
+        for episode, seed in enumerate(course_seeds):
+            episode_fitness = fitness[episode]
+            capped = episode_fitness >= fitness_cap if fitness_cap is not None else np.zeros(len(episode_fitness), bool)
+            if capped.all():
+                final = capped
+            else:
+                final = capped | (episode_fitness < episode_fitness[~capped].max())
+
+            for row in np.flatnonzero(final):
+                key = (hashes[row], seed)
+                self.entries[key] = float(episode_fitness[row])
+                self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def split(self, genomes, course_seeds, top_k=1):
+        """Look genomes up and return (hashes, known, missing, ghosts).
+
+        known is the cached fitness matrix, missing a mask of the genomes that
+        have to be flown, and ghosts the cached fitness of the others per
+        episode, for World.set_ghosts. Genomes are flown if some episode isn't
+        cached or if they are among the top_k cached birds of an episode: the
+        birds still flying when the top_k rule ends an episode are cut short,
+        and only they depend on the rest of the population. With top_k of the
+        best ghosts flown, no ghost can be among them.
+        """
+        hashes, known = self.lookup(genomes, course_seeds)
+        missing = np.isnan(known).any(axis=0)
+        if top_k and len(genomes):
+            best = np.argsort(np.where(np.isnan(known), -np.inf, known), axis=1, kind="stable")[:, -top_k:]
+            missing[best.ravel()] = True
+        self.misses += np.count_nonzero(missing)
+        self.hits += len(missing) - np.count_nonzero(missing)
+        ghosts = [episode[~missing] for episode in known]
+        return hashes, known, missing, ghosts
+
+    def merge(self, hashes, known, missing, course_seeds, flown, fitness_cap=None):
+        """Store the fitness of the flown genomes and return the fitness matrix of all of them."""
+        self.store([digest for digest, flew in zip(hashes, missing) if flew], course_seeds, flown, fitness_cap)
+        fitness = known.copy()
+        fitness[:, missing] = flown
+        return fitness
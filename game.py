@@ -1,19 +1,46 @@
-import pygame
-import random
 import time
+import numpy as np
 from bird import Bird
-from pipe import Pipe
-from config import GAME_WIDTH, SCREEN_WIDTH, SCREEN_HEIGHT, PIPE_GAP, PIPE_FREQUENCY, BIRD_COUNT
+from neural_network import NeuralNetwork
+from world import World, LAYER_SIZES
+from batch_network import BatchNetwork
+from rng import RandomStreams
+from course import generate_course
+from stats import Stats
+from config import GAME_WIDTH, SCREEN_WIDTH, SCREEN_HEIGHT, PIPE_GAP, PIPE_FREQUENCY, BIRD_COUNT, COURSE_LENGTH, ALIVE_CURVE_INTERVAL
 
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.birds = [Bird() for _ in range(BIRD_COUNT)]  # Initial population using config
+    def __init__(self, headless=False, fixed_timestep=None, streams=None):
+        # Headless games have no window or fonts and always advance by a fixed
+        # timestep so training runs are deterministic and not tied to the clock
+        self.headless = headless
+        if headless and fixed_timestep is None:
+            fixed_timestep = 1.0
+        self.fixed_timestep = fixed_timestep
+        
+        # All randomness comes from seeded streams so runs can be reproduced
+        self.streams = streams or RandomStreams()
+        self.world = World()
+        self.new_course(self.streams.course_seeds(1)[0])
+        
+        self.birds = [Bird(NeuralNetwork(LAYER_SIZES, rng=self.streams.init), copy_brain=False)
+                      for _ in range(BIRD_COUNT)]  # Initial population using config
         self.pipes = []
         self.score = 0
         self.speed = 1
         self.frame_counter = 0
-        self.font = pygame.font.SysFont('Arial', 25)
+        self.alive_curve = []  # Living birds every ALIVE_CURVE_INTERVAL frames of the episode
+        self.screen = None
+        self.font = None
+        self.text = None
+        if not headless:
+            # Rendering is only loaded when there is a window, so headless
+            # training and its worker processes never import pygame
+            import pygame
+            from renderer import TextCache
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.font = pygame.font.SysFont('Arial', 25)
+            self.text = TextCache(self.font)
         self.bg_color = (135, 206, 250)  # Light blue
         
         # For smoother animation
@@ -22,152 +49,300 @@ class Game:
         
         # For vector visualization
         self.show_vectors = False
+        
+        # Time per phase and event counts, shared with the genetic algorithm
+        self.stats = Stats()
+        
+        # Replays: when jump_log is a (frames, birds) bool array every jump is
+        # recorded into it, when jump_script is set the birds replay its jumps
+        # instead of asking their brains
+        self.jump_log = None
+        self.jump_script = None
+    
+    @property
+    def birds(self):
+        # After set_genomes resizes the population the birds are only created
+        # again when something asks for them, headless training never does
+        if self._birds is None:
+            self._birds = [self.bird_view(index) for index in range(len(self.world.genomes))]
+        return self._birds
+    
+    @birds.setter
+    def birds(self, birds):
+        # Keep the world arrays and batched brains in sync whenever the population is replaced
+        layer_sizes = birds[0].brain.layer_sizes
+        self.check_inputs(layer_sizes)
+        genomes = np.array([bird.brain.flatten() for bird in birds], dtype=float)
+        self._birds = birds
+        self.world.bind_birds(birds, layer_sizes, genomes)
+        for bird in birds:
+            bird.rng = self.streams.mutation
+        self.brains = BatchNetwork(layer_sizes, genomes)
+        self._thinking = None
+    
+    def set_genomes(self, genomes, layer_sizes=None):
+        """Start a new generation from a (birds, parameters) genome matrix.
+        
+        The existing birds are reused as views when the population keeps its
+        size and topology. Otherwise only the world arrays and batched brains
+        are resized, no per-bird objects are created. Returns the previous
+        genome matrix so callers can recycle it as a buffer.
+        """
+        previous = self.world.genomes
+        
+        if layer_sizes is None:
+            layer_sizes = self.world.layer_sizes
+        self.check_inputs(layer_sizes)
+        resized = len(genomes) != len(previous) or list(layer_sizes) != self.world.layer_sizes
+        if list(layer_sizes) != self.world.layer_sizes:
+            self.world.layer_sizes = list(layer_sizes)
+            self.brains = BatchNetwork(layer_sizes, genomes)
+        else:
+            self.brains.load(genomes)
+        if resized:
+            self.world.resize_birds(len(genomes))
+            self._birds = None
+        
+        self.world.genomes = genomes
+        self.world.genomes_changed = False
+        self.world.reset_birds()
+        self._thinking = None
+        return previous
+    
+    def bird_view(self, index):
+        """Bird that reads and writes slot index of the world's arrays."""
+        bird = Bird(self.world.brain(index), copy_brain=False, rng=self.streams.mutation)
+        bird.bind(self.world, index)
+        return bird
+    
+    def check_inputs(self, layer_sizes):
+        """Make sure brains with these layer sizes take the inputs the configured sensors produce."""
+        if layer_sizes[0] != self.world.sensors.count:
+            raise ValueError(f"Brains take {layer_sizes[0]} inputs but the sensors "
+                             f"{self.world.sensors.features} produce {self.world.sensors.count}")
+    
+    @property
+    def pipes(self):
+        return [self.world.pipe_view(slot) for slot in self.world.pipe_slots()]
+    
+    @pipes.setter
+    def pipes(self, pipes):
+        self.world.clear_pipes()
+        for pipe in pipes:
+            slot = self.world.add_pipe(pipe.x, pipe.gap_y)
+            self.world.pipe_passed[slot] = pipe.passed
     
     def update(self):
-        # Calculate delta time for smoother animation
-        current_time = time.time()
-        self.delta_time = (current_time - self.last_time) * 60  # Convert to frames equivalent
-        self.last_time = current_time
+        if self.fixed_timestep is not None:
+            self.delta_time = self.fixed_timestep
+        else:
+            # Calculate delta time for smoother animation
+            current_time = time.time()
+            self.delta_time = (current_time - self.last_time) * 60  # Convert to frames equivalent
+            self.last_time = current_time
+            
+            # Make sure delta_time is reasonable (preventing large jumps if game is paused or lagging)
+            self.delta_time = min(self.delta_time, 3.0)
         
-        # Make sure delta_time is reasonable (preventing large jumps if game is paused or lagging)
-        self.delta_time = min(self.delta_time, 3.0)
+        # With a fixed timestep every step is a whole frame, so speed is the
+        # number of frames simulated per update. With the wall clock the
+        # elapsed time is split into speed smaller steps instead.
+        step_time = self.delta_time if self.fixed_timestep is not None else self.delta_time / self.speed
         
-        # Add new pipe periodically
-        if self.frame_counter % PIPE_FREQUENCY == 0:
-            gap_y = random.randint(100, SCREEN_HEIGHT - 100 - PIPE_GAP)
-            self.pipes.append(Pipe(SCREEN_WIDTH, gap_y))
+        world = self.world
+        stats = self.stats
+        stats.start()
         
         # Update all game objects
         for _ in range(self.speed):
-            # Update pipes with delta time
-            for pipe in self.pipes:
-                pipe.update(self.delta_time / self.speed)
+            if self.frame_counter % ALIVE_CURVE_INTERVAL == 0:
+                self.alive_curve.append(len(world.active))
+            
+            # Add new pipe periodically
+            if self.frame_counter % PIPE_FREQUENCY == 0:
+                # Extend the precomputed course if the birds have flown past its end
+                if self.pipes_spawned == self.course.shape[-1]:
+                    self.extend_course()
+                # One gap height, or one per lane when flying several courses
+                world.add_pipe(SCREEN_WIDTH, self.course[..., self.pipes_spawned])
+                self.pipes_spawned += 1
             
-            # Remove pipes that have gone off screen
-            self.pipes = [pipe for pipe in self.pipes if pipe.x > -pipe.width]
+            # Move pipes and remove the ones that have gone off screen
+            world.move_pipes(step_time)
+            stats.lap("pipes")
+            
+            # Look up the next pipe once for the whole population
+            active = world.active
+            next_slot, overlapping = world.pipes_ahead()
+            
+            # Make decisions for every living bird in one batched pass
+            if next_slot is not None and len(active):
+                if self.jump_script is not None:
+                    jumping = self.scripted_jumps()
+                else:
+                    thinking, brains = self.thinking_brains(active)
+                    inputs = world.sense(thinking, next_slot)
+                    stats.lap("sense")
+                    outputs = brains.feedforward(inputs)
+                    stats.count("forward_passes", len(thinking))
+                    stats.lap("think")
+                    jumping = thinking[outputs[:, 0] > 0.5]
+                jumping = jumping[world.bird_alive[jumping]]
+                world.jump(jumping)
+                if self.jump_log is not None and self.frame_counter < len(self.jump_log):
+                    self.jump_log[self.frame_counter, jumping] = True
             
             # Update birds
-            for bird in self.birds:
-                if bird.alive:
-                    # Get inputs for neural network
-                    closest_pipe = self.get_closest_pipe(bird)
-                    
-                    if closest_pipe:
-                        inputs = [
-                            bird.y / SCREEN_HEIGHT,
-                            closest_pipe.x / SCREEN_WIDTH,
-                            closest_pipe.gap_y / SCREEN_HEIGHT,
-                            (closest_pipe.gap_y + PIPE_GAP) / SCREEN_HEIGHT
-                        ]
-                        
-                        # Make decision based on neural network output
-                        if bird.think(inputs) > 0.5:
-                            bird.jump()
-                    
-                    bird.update(self.delta_time / self.speed)
-                    
-                    # Check for collisions
-                    if self.check_collision(bird):
-                        bird.alive = False
-                    else:
-                        bird.fitness += 0.1  # Reward for staying alive
-                        
-                        # Check if bird passed a pipe
-                        for pipe in self.pipes:
-                            if pipe.x + pipe.width / 2 < bird.x < pipe.x + pipe.width / 2 + 4 and not pipe.passed:
-                                bird.fitness += 5  # Reward for passing pipe
-                                pipe.passed = True
-                                self.score += 1
+            world.move_birds(step_time)
+            stats.lap("physics")
+            
+            # Check for collisions
+            hit = world.collide(active, overlapping)
+            world.kill(active[hit])
+            stats.lap("collide")
+            
+            # Reward survivors for staying alive and for passing pipes
+            self.score += world.reward(world.active)
+            stats.lap("reward")
             
             self.frame_counter += 1
+        
+        stats.count("steps", self.speed)
     
-    def draw(self):
+    def draw(self, max_birds=None):
+        """Draw the game area and return the rectangle that was drawn.
+        
+        Only the first max_birds living birds are drawn, which keeps drawing
+        cheap for large populations.
+        """
+        if self.headless:
+            return None
+        import pygame
+        self.stats.start()
+        
         # Draw game area background
-        pygame.draw.rect(self.screen, self.bg_color, (0, 0, GAME_WIDTH, SCREEN_HEIGHT))
+        area = pygame.draw.rect(self.screen, self.bg_color, (0, 0, GAME_WIDTH, SCREEN_HEIGHT))
         
         # Draw pipes
         for pipe in self.pipes:
             pipe.draw(self.screen)
         
+        # All birds share the same closest pipe
+        closest_pipe = self.get_closest_pipe(None) if self.show_vectors else None
+        
         # Draw birds and vectors
-        for bird in self.birds:
-            if bird.alive:
-                bird.draw(self.screen)
+        for index in self.world.active[:max_birds]:
+            bird = self.birds[index]
+            bird.draw(self.screen)
+            
+            # Draw vectors if enabled
+            if closest_pipe:
+                # Vector to top of closest pipe gap
+                pygame.draw.line(self.screen, (255, 0, 0), 
+                                (bird.x + bird.width/2, bird.y + bird.height/2),
+                                (closest_pipe.x, closest_pipe.gap_y),
+                                2)
                 
-                # Draw vectors if enabled
-                if self.show_vectors:
-                    closest_pipe = self.get_closest_pipe(bird)
-                    if closest_pipe:
-                        # Vector to top of closest pipe gap
-                        pygame.draw.line(self.screen, (255, 0, 0), 
-                                        (bird.x + bird.width/2, bird.y + bird.height/2),
-                                        (closest_pipe.x, closest_pipe.gap_y),
-                                        2)
-                        
-                        # Vector to bottom of closest pipe gap
-                        pygame.draw.line(self.screen, (0, 0, 255),
-                                        (bird.x + bird.width/2, bird.y + bird.height/2),
-                                        (closest_pipe.x, closest_pipe.gap_y + PIPE_GAP),
-                                        2)
-                                        
-                        # Vector to horizontal distance
-                        pygame.draw.line(self.screen, (0, 255, 0),
-                                        (bird.x + bird.width/2, bird.y + bird.height/2),
-                                        (closest_pipe.x, bird.y + bird.height/2),
-                                        2)
-        
-        # Draw score and info
-        score_text = self.font.render(f'Score: {self.score}', True, (0, 0, 0))
-        alive_text = self.font.render(f'Alive: {sum(bird.alive for bird in self.birds)}', True, (0, 0, 0))
-        speed_text = self.font.render(f'Speed: {self.speed}x', True, (0, 0, 0))
-        
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(alive_text, (10, 40))
-        self.screen.blit(speed_text, (10, 70))
-    
-    def get_closest_pipe(self, bird):
-        closest_pipe = None
-        closest_distance = float('inf')
+                # Vector to bottom of closest pipe gap
+                pygame.draw.line(self.screen, (0, 0, 255),
+                                (bird.x + bird.width/2, bird.y + bird.height/2),
+                                (closest_pipe.x, closest_pipe.gap_y + PIPE_GAP),
+                                2)
+                                
+                # Vector to horizontal distance
+                pygame.draw.line(self.screen, (0, 255, 0),
+                                (bird.x + bird.width/2, bird.y + bird.height/2),
+                                (closest_pipe.x, bird.y + bird.height/2),
+                                2)
         
-        for pipe in self.pipes:
-            if pipe.x + pipe.width > bird.x:  # Only consider pipes ahead of bird
-                distance = pipe.x - bird.x
-                if distance < closest_distance:
-                    closest_distance = distance
-                    closest_pipe = pipe
+        # Draw score and info, only re-rendering text that has changed
+        self.screen.blit(self.text.render(f'Score: {self.score}'), (10, 10))
+        self.screen.blit(self.text.render(f'Alive: {len(self.world.active)}'), (10, 40))
+        self.screen.blit(self.text.render(f'Speed: {self.speed}x'), (10, 70))
         
-        return closest_pipe
+        self.stats.lap("draw")
+        return area
     
-    def check_collision(self, bird):
-        # Check if bird hits the floor or ceiling
-        if bird.y <= 0 or bird.y >= SCREEN_HEIGHT - bird.height:
-            return True
+    def scripted_jumps(self):
+        """Birds that jump this frame according to jump_script."""
+        if self.frame_counter >= len(self.jump_script):
+            return np.empty(0, dtype=int)
+        return np.flatnonzero(self.jump_script[self.frame_counter])
+    
+    def thinking_brains(self, active):
+        """Return the birds to run the networks for and a BatchNetwork holding just their brains.
         
-        # Check if bird hits a pipe
-        for pipe in self.pipes:
-            # Check collision with top pipe
-            if (bird.x < pipe.x + pipe.width and 
-                bird.x + bird.width > pipe.x and 
-                bird.y < pipe.gap_y):
-                return True
-            
-            # Check collision with bottom pipe
-            if (bird.x < pipe.x + pipe.width and 
-                bird.x + bird.width > pipe.x and 
-                bird.y + bird.height > pipe.gap_y + PIPE_GAP):
-                return True
+        The weights of the active birds are gathered into a compact network
+        only once at least half of the previously gathered birds have died,
+        so dead birds stop costing anything without re-gathering every frame.
+        The returned birds can include some that have died since.
+        """
+        # A bird's brain was replaced or mutated on its own
+        if self.world.genomes_changed:
+            self.world.genomes_changed = False
+            self.brains.load(self.world.genomes)
+            self._thinking = None
         
-        return False
+        if len(active) == self.brains.size:
+            self._thinking = None
+            return active, self.brains
+        
+        # A larger active set than last time means a new episode has started
+        if self._thinking is None or len(active) > len(self._thinking) or len(active) <= len(self._thinking) // 2:
+            self._thinking = active
+            self._thinking_brains = BatchNetwork(self.world.layer_sizes, self.world.genomes[active])
+            self.stats.count("allocations")
+        
+        return self._thinking, self._thinking_brains
+    
+    def get_closest_pipe(self, bird):
+        # All birds share the same x, so the closest pipe is the same for everyone
+        next_slot, _ = self.world.pipes_ahead()
+        return None if next_slot is None else self.world.pipe_view(next_slot)
+    
+    def check_collision(self, bird):
+        _, overlapping = self.world.pipes_ahead()
+        return bool(self.world.collide([bird.index], overlapping)[0])
     
     def all_birds_dead(self):
-        return all(not bird.alive for bird in self.birds)
+        return len(self.world.active) == 0
     
     def all_birds_except_one_dead(self):
         """Return True if only one or fewer birds are alive."""
-        alive_count = sum(bird.alive for bird in self.birds)
-        return alive_count <= 1
+        return len(self.world.active) <= 1
     
-    def reset(self):
-        self.pipes = []
+    def new_course(self, seed, gaps=None):
+        """Fly the course with the given seed from the next pipe on.
+        
+        gaps can be the already generated course, e.g. from shared memory.
+        seed can also be a list of seeds (and gaps a list of courses) to fly
+        several courses at once, one per lane of the world.
+        """
+        self.course_seed = seed
+        if isinstance(seed, (list, tuple)):
+            if gaps is None:
+                gaps = [generate_course(lane_seed, COURSE_LENGTH) for lane_seed in seed]
+            self.course = np.stack(gaps)
+            self.world.set_lanes(len(seed))
+        else:
+            self.course = gaps if gaps is not None else generate_course(seed, COURSE_LENGTH)
+            self.world.set_lanes(1)
+        self.pipes_spawned = 0
+    
+    def extend_course(self):
+        """Double the length of the precomputed course(s), keeping the pipes already generated."""
+        length = 2 * self.course.shape[-1]
+        if self.course.ndim == 1:
+            self.course = generate_course(self.course_seed, length)
+        else:
+            self.course = np.stack([generate_course(lane_seed, length) for lane_seed in self.course_seed])
+    
+    def reset(self, seed=None, gaps=None):
+        """Clear the pipes and start a new course, drawn from the course stream unless seed is given."""
+        if seed is None:
+            seed = self.streams.course_seeds(1)[0]
+        self.new_course(seed, gaps)
+        self.world.clear_pipes()
         self.score = 0
         self.frame_counter = 0
+        self.alive_curve = []
@@ -1,68 +1,193 @@
-import random
 import numpy as np
 from bird import Bird
-from config import BIRD_COUNT
+from neural_network import NeuralNetwork
+from selection import SELECTION_STRATEGIES, roulette, elites
+from config import SELECTION, ELITE_COUNT
 
 class GeneticAlgorithm:
-    def __init__(self, game, mutation_rate=0.1):
+    """Evolves the population held by a game.
+
+    The population is one (birds, parameters) genome matrix owned by the
+    game's world. A new generation is written into a spare matrix and then
+    swapped in, so while the population keeps its size evolving never
+    creates per-bird objects or reallocates. Only when a controller resizes
+    the population are the spare matrix and the birds rebuilt.
+    """
+
+    def __init__(self, game, mutation_rate=0.1, selection=SELECTION, elite_count=ELITE_COUNT, controller=None):
         self.game = game
-        self.population = self.game.birds
         self.mutation_rate = mutation_rate
-    
+        self.elite_count = elite_count
+
+        # An AdaptiveController tunes the mutation rate and population size every generation
+        self.controller = controller
+        self.parent_fitness = None
+        
+        # Mutation and crossover draw from one stream, parent selection from another
+        self.rng = game.streams.mutation
+        self.selection_rng = game.streams.selection
+        
+        # Selection can be the name of a built-in strategy or any function with the same signature
+        self.selection = SELECTION_STRATEGIES[selection] if isinstance(selection, str) else selection
+
+        # Reusable buffers for the next generation and the random draws that produce it
+        self._spare = None
+        self._mask = None
+        self._noise = None
+
+        # Rows of the previous generation each bird of the current one was bred from
+        self.parents = None
+        self._bred = None
+
+    @property
+    def population(self):
+        return self.game.birds
+
+    @population.setter
+    def population(self, population):
+        self.game.birds = population
+
+    @property
+    def genomes(self):
+        return self.game.world.genomes
+
+    @property
+    def layer_sizes(self):
+        return self.game.world.layer_sizes
+
+    @property
+    def fitness(self):
+        return self.game.world.bird_fitness
+
     def calculate_best_fitness(self):
         """Calculate the highest fitness score in the population."""
-        return max(bird.fitness for bird in self.population) if self.population else 0
-    
+        return self.fitness.max() if len(self.fitness) else 0
+
+    def set_fitness(self, fitness):
+        """Overwrite the fitness of each bird with externally evaluated scores."""
+        self.fitness[:] = fitness
+
+    def immigrate(self, genomes):
+        """Replace the last birds of the generation with genomes from elsewhere, e.g. another island.
+
+        Elites are bred into the front of every generation, so they are never
+        the ones replaced; immigrants beyond the birds that aren't elites are
+        turned away.
+        """
+        population = self.genomes
+        genomes = genomes[:max(len(population) - self.elite_count, 0)]
+        population[len(population) - len(genomes):] = genomes
+        if self.parents is not None:
+            self.parents[len(population) - len(genomes):] = -1
+        self.game.set_genomes(population)
+
+    def lineage(self):
+        """(birds, 2) rows of the previous generation each bird was bred from, -1 for none.
+
+        None if the population has been replaced since it was last evolved.
+        """
+        if self._bred is None or self.genomes is not self._bred:
+            return None
+        return self.parents
+
     def select_parent(self):
         """Select a parent bird using fitness-based selection."""
-        # Calculate sum of fitness scores
-        total_fitness = sum(bird.fitness for bird in self.population)
-        
-        if total_fitness == 0:
-            # If all fitness scores are zero, select randomly
-            return random.choice(self.population)
-        
-        # Select parent based on fitness probability
-        selection_point = random.uniform(0, total_fitness)
-        current_sum = 0
-        
-        for bird in self.population:
-            current_sum += bird.fitness
-            if current_sum >= selection_point:
-                return bird
-        
-        # Fallback
-        return self.population[-1]
-    
+        return self.population[roulette(self.fitness, 1, self.selection_rng)[0]]
+
+    def select_parents(self, count):
+        """Indices of count parents picked with the configured selection strategy."""
+        return self.selection(self.fitness, count, self.selection_rng)
+
     def crossover(self, parent1, parent2):
         """Create a child bird with traits from both parents."""
-        child = Bird()
-        
-        # Crossover weights and biases
-        for i in range(len(parent1.brain.weights)):
-            # Decide which parent's weights and biases to use for each neuron
-            mask = np.random.random(parent1.brain.weights[i].shape) < 0.5
-            child.brain.weights[i] = np.where(mask, parent1.brain.weights[i], parent2.brain.weights[i])
-            
-            mask = np.random.random(parent1.brain.biases[i].shape) < 0.5
-            child.brain.biases[i] = np.where(mask, parent1.brain.biases[i], parent2.brain.biases[i])
-        
-        return child
-    
-    def evolve(self):
-        """Create a new generation of birds using selection, crossover, and mutation."""
-        new_population = []
-        
-        # Find the best bird (might be the only one alive)
-        best_bird = max(self.population, key=lambda bird: bird.fitness)
-        new_population.append(Bird(best_bird.brain))
-        
-        # Create the rest of the population based on the best bird
-        for _ in range(BIRD_COUNT - 1):
-            child = Bird(best_bird.brain)
-            child.mutate(self.mutation_rate)
-            new_population.append(child)
+        genomes = np.array([parent1.brain.flatten(), parent2.brain.flatten()])
+        child = np.empty((1, genomes.shape[1]))
+        self.crossover_genomes(genomes, [0], [1], child)
+        return Bird(NeuralNetwork.from_flat(parent1.brain.layer_sizes, child[0]), copy_brain=False, rng=self.rng)
+
+    def crossover_genomes(self, genomes, parents1, parents2, out):
+        """Uniform crossover for a batch of children at once.
+
+        Child i takes each parameter from genomes[parents1[i]] or
+        genomes[parents2[i]] with equal probability and is written to out[i].
+        """
+        mask, other = self._buffers(out.shape)
+        self.rng.random(out=other)
+        np.less(other, 0.5, out=mask)
+        np.take(genomes, parents1, axis=0, out=out)
+        np.take(genomes, parents2, axis=0, out=other)
+        np.copyto(out, other, where=mask)
+
+    def mutate_genomes(self, genomes, rate):
+        """Add Gaussian noise to each parameter of genomes with probability rate, in place."""
+        mask, noise = self._buffers(genomes.shape)
+        self.rng.random(out=noise)
+        np.less(noise, rate, out=mask)
+        self.rng.standard_normal(out=noise)
+        np.add(genomes, noise, out=genomes, where=mask)
+
+    def _buffers(self, shape):
+        # Views of the preallocated mask and noise buffers with the given shape,
+        # only reallocated when the population grows
+        count = int(np.prod(shape))
+        if self._mask is None or self._mask.size < count:
+            self._mask = np.empty(count, dtype=bool)
+            self._noise = np.empty(count)
+            self.game.stats.count("allocations", 2)
+        return self._mask[:count].reshape(shape), self._noise[:count].reshape(shape)
+
+    def evolve(self, fitness=None, elapsed=None):
+        """Create a new generation of birds using selection, crossover, and mutation.
+
+        If fitness is given (e.g. from a parallel evaluation) it replaces the
+        fitness the birds earned in the game. elapsed is the time evaluating
+        this generation took, which lets a controller size the next one.
+        """
+        if fitness is not None:
+            self.set_fitness(fitness)
+
+        stats = self.game.stats
+        stats.start()
+
+        genomes = self.genomes
+        if genomes.dtype != np.float64:
+            # A population loaded from a float32 checkpoint is bred in float64 from its first generation on
+            genomes = genomes.astype(np.float64)
+        size = len(genomes)
+        if self.controller is not None:
+            self.mutation_rate = self.controller.mutation_rate(self)
+            size = self.controller.population_size(size, elapsed)
+            self.parent_fitness = self.fitness.copy()
+
+        if self._spare is None or self._spare.shape != (size, genomes.shape[1]) or self._spare.dtype != genomes.dtype:
+            self._spare = np.empty((size, genomes.shape[1]), dtype=genomes.dtype)
+            stats.count("allocations")
+        children = self._spare
+
+        if self.parents is None or len(self.parents) != size:
+            self.parents = np.empty((size, 2), dtype=int)
+
+        # Copy the best birds unchanged (the best might be the only one alive)
+        elite = elites(self.fitness, min(self.elite_count, size))
+        np.take(genomes, elite, axis=0, out=children[:len(elite)])
+        self.parents[:len(elite)] = elite[:, None]
         
-        # Replace old population with new one
-        self.population = new_population
-        self.game.birds = new_population
+        # Breed the rest of the population from selected pairs of parents
+        offspring = children[len(elite):]
+        stats.lap("select")
+        if len(offspring):
+            parents1 = self.select_parents(len(offspring))
+            parents2 = self.select_parents(len(offspring))
+            self.parents[len(elite):, 0] = parents1
+            self.parents[len(elite):, 1] = parents2
+            stats.lap("select")
+            self.crossover_genomes(genomes, parents1, parents2, offspring)
+            stats.lap("crossover")
+            self.mutate_genomes(offspring, self.mutation_rate)
+            stats.lap("mutate")
+
+        # Swap the buffers, the old generation becomes the spare for the next one
+        self._spare = self.game.set_genomes(children)
+        # A resized population is copied into a new matrix, which keeps the same lineage
+        self._bred = self.genomes
+        stats.lap("swap")
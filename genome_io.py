@@ -0,0 +1,58 @@
+import struct
+import numpy as np
+from neural_network import NeuralNetwork
+
+# Binary checkpoint layout:
+#   magic, version, dtype code, population size, layer count  (CHECKPOINT_HEADER)
+#   layer sizes                                               (uint32 each)
+#   padding up to a multiple of CHECKPOINT_ALIGNMENT
+#   fitness                                                   (float64, one per bird)
+#   genomes                                                   (dtype, birds x parameters)
+CHECKPOINT_MAGIC = b"GFBP"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_HEADER = struct.Struct("<4sIIQI")
+CHECKPOINT_ALIGNMENT = 64
+CHECKPOINT_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f8")}
+
+def save_genomes(filename, layer_sizes, genomes, fitness, dtype=np.float32):
+    """Write a (birds, parameters) genome array and its fitness as a binary checkpoint."""
+    dtype = np.dtype(dtype).newbyteorder("<")
+    dtype_codes = {d: code for code, d in CHECKPOINT_DTYPES.items()}
+    if dtype not in dtype_codes:
+        raise ValueError(f"Checkpoints can only store float32 or float64 weights, not {dtype}")
+    dtype_code = dtype_codes[dtype]
+
+    header = CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, dtype_code,
+                                    len(genomes), len(layer_sizes))
+    header += np.asarray(layer_sizes, dtype="<u4").tobytes()
+    header += b"\0" * (-len(header) % CHECKPOINT_ALIGNMENT)
+
+    with open(filename, 'wb') as f:
+        f.write(header)
+        f.write(np.asarray(fitness, dtype="<f8").tobytes())
+        np.asarray(genomes, dtype=dtype).tofile(f)
+
+def load_genomes(filename):
+    """Memory-map a binary checkpoint and return (layer_sizes, genomes, fitness).
+
+    The genome array is mapped copy-on-write, so loading is zero-copy and
+    mutating it never touches the file.
+    """
+    with open(filename, 'rb') as f:
+        magic, version, dtype_code, population_size, layer_count = CHECKPOINT_HEADER.unpack(
+            f.read(CHECKPOINT_HEADER.size))
+        if magic != CHECKPOINT_MAGIC:
+            raise ValueError(f"{filename} is not a population checkpoint")
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {version}")
+        layer_sizes = np.frombuffer(f.read(4 * layer_count), dtype="<u4").tolist()
+
+    header_size = CHECKPOINT_HEADER.size + 4 * layer_count
+    offset = header_size + (-header_size % CHECKPOINT_ALIGNMENT)
+    fitness = np.memmap(filename, dtype="<f8", mode='r', offset=offset, shape=(population_size,))
+
+    genomes = np.memmap(filename, dtype=CHECKPOINT_DTYPES[dtype_code], mode='c',
+                        offset=offset + 8 * population_size,
+                        shape=(population_size, NeuralNetwork.parameter_count(layer_sizes)))
+
+    return layer_sizes, genomes, fitness
@@ -0,0 +1,134 @@
+import multiprocessing
+import numpy as np
+from game import Game
+from genetic_algorithm import GeneticAlgorithm
+from scheduler import EpisodeScheduler
+from selection import elites
+from rng import RandomStreams
+from config import SELECTION, ELITE_COUNT
+
+def run_island(connection, seed, fixed_course, genomes, layer_sizes, mutation_rate, selection, elite_count, scheduler):
+    """Evolve one island's population in a worker process, driven by messages on connection.
+
+    Each ("run", generations, migrants, immigrants) message first swaps the
+    immigrants in for the island's weakest newcomers, then runs the given
+    number of generations and replies with the best fitness of every
+    generation plus the migrants fittest genomes of the last one.
+    ("population",) replies with the last evaluated population, or the
+    starting one before any generation has run, and None stops.
+    """
+    game = Game(headless=True, streams=RandomStreams(seed, fixed_course))
+    genetic_algorithm = GeneticAlgorithm(game, mutation_rate, selection, elite_count)
+    if genomes is not None:
+        game.set_genomes(genomes, layer_sizes)
+    evaluated = None
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+
+        if message[0] == "population":
+            if evaluated is None:
+                # No generation has run yet, so the starting population is all there is
+                connection.send((genetic_algorithm.layer_sizes, genetic_algorithm.genomes.copy(),
+                                 genetic_algorithm.fitness.copy()))
+            else:
+                connection.send(evaluated)
+            continue
+
+        _, generations, migrants, immigrants = message
+        if immigrants is not None:
+            genetic_algorithm.immigrate(immigrants)
+
+        best = []
+        for _ in range(generations):
+            scheduler.run(game)
+            best.append(genetic_algorithm.calculate_best_fitness())
+            evaluated = (genetic_algorithm.layer_sizes, genetic_algorithm.genomes.copy(),
+                         genetic_algorithm.fitness.copy())
+            genetic_algorithm.evolve()
+            game.reset()
+
+        _, genomes, fitness = evaluated
+        connection.send((best, genomes[elites(fitness, migrants)]))
+
+class IslandModel:
+    """Evolves several sub-populations in parallel processes with occasional migration.
+
+    Every island is its own headless Game and GeneticAlgorithm with its own
+    random streams, so islands explore independently. Every interval
+    generations the migrants fittest birds of each island replace the
+    weakest newcomers of the next island in a ring, which spreads good
+    solutions without letting one of them take over every island at once.
+    """
+
+    def __init__(self, islands=4, interval=10, migrants=2, mutation_rate=0.1, selection=SELECTION,
+                 elite_count=ELITE_COUNT, scheduler=None, streams=None, population=None):
+        self.islands = islands
+        self.interval = interval
+        self.migrants = migrants
+        streams = streams or RandomStreams()
+
+        # A starting population given as (layer_sizes, genomes) is dealt out across the islands
+        layer_sizes, blocks = None, [None] * islands
+        if population is not None:
+            layer_sizes, genomes = population
+            blocks = np.array_split(genomes, islands)
+
+        self.connections = []
+        self.processes = []
+        for seed, block in zip(streams.spawn(islands), blocks):
+            connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_island, daemon=True,
+                args=(child_connection, seed, streams.fixed_course, block, layer_sizes,
+                      mutation_rate, selection, elite_count, scheduler or EpisodeScheduler()))
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def run(self, generations):
+        """Evolve every island for the given number of generations and return the best fitness per generation."""
+        history = []
+        immigrants = [None] * self.islands
+        generation = 0
+
+        while generation < generations:
+            epoch = min(self.interval, generations - generation)
+            for connection, arrivals in zip(self.connections, immigrants):
+                connection.send(("run", epoch, self.migrants, arrivals))
+            replies = [connection.recv() for connection in self.connections]
+
+            best = np.array([island_best for island_best, _ in replies]).max(axis=0)
+            history.extend(best.tolist())
+            generation += epoch
+            print(f"Generation {generation} complete: best fitness {best[-1]:.1f}, "
+                  f"per island {' '.join(f'{island_best[-1]:.1f}' for island_best, _ in replies)}")
+
+            # Island i receives the emigrants of island i - 1
+            emigrants = [island_emigrants for _, island_emigrants in replies]
+            immigrants = emigrants[-1:] + emigrants[:-1]
+
+        return history
+
+    def population(self):
+        """The last evaluated population of all islands together, as (layer_sizes, genomes, fitness)."""
+        for connection in self.connections:
+            connection.send(("population",))
+        replies = [connection.recv() for connection in self.connections]
+
+        layer_sizes = replies[0][0]
+        return (layer_sizes, np.concatenate([genomes for _, genomes, _ in replies]),
+                np.concatenate([fitness for _, _, fitness in replies]))
+
+    def close(self):
+        for connection, process in zip(self.connections, self.processes):
+            connection.send(None)
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,34 +1,57 @@
-import pygame
+import argparse
 import sys
+import time
 from game import Game
 from genetic_algorithm import GeneticAlgorithm
-from utils import save_population, load_population
-from settings_panel import SettingsPanel
+from utils import load_saved_population
+from trainer import train, train_islands
+from checkpoint import CheckpointWriter
+from rng import RandomStreams
+from scheduler import EpisodeScheduler
+from stats import StatsLog
+from metrics import MetricsLog
+from replay import ReplayRecorder, ReplayPlayer, read_replays
+from selection import SELECTION_STRATEGIES
+from evaluation import AGGREGATES
+from fitness_cache import FitnessCache
+from adaptive import AdaptiveController
+from config import REPLAY_KEYFRAMES, POPULATION_FILE, SELECTION, ELITE_COUNT, EPISODE_AGGREGATE, EPISODE_QUANTILE, FITNESS_CACHE_MB, RENDER_FPS, RENDER_EVERY, MAX_DRAWN_BIRDS
 
-def main():
+# pygame and the modules drawing with it are imported by the windowed modes
+# only, so headless training starts without loading SDL
+
+def run_windowed(checkpoint_writer, streams, renderer, stats_log=None, metrics_log=None):
+    import pygame
+    from settings_panel import SettingsPanel
+    
     pygame.init()
     pygame.display.set_caption("Genetic Flappy Bird")
     
-    # Initialize game and genetic algorithm
-    game = Game()
+    # Initialize game and genetic algorithm. The simulation steps by whole
+    # frames so it can run ahead of the renderer at high speeds.
+    game = Game(fixed_timestep=1.0, streams=streams)
     genetic_algorithm = GeneticAlgorithm(game)
-    settings_panel = SettingsPanel(genetic_algorithm)
+    settings_panel = SettingsPanel(genetic_algorithm, checkpoint_writer)
     
     # Check if a saved population exists
     try:
-        population = load_population("population.json")
-        genetic_algorithm.population = population
-        game.birds = population
+        layer_sizes, genomes, _ = load_saved_population()
+        game.set_genomes(genomes, layer_sizes)
         print("Loaded saved population")
     except:
         print("Starting with new population")
     
     generation = 1
-    clock = pygame.time.Clock()
+    generation_start = time.time()
     
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                checkpoint_writer.close()
+                if stats_log:
+                    stats_log.close()
+                if metrics_log:
+                    metrics_log.close()
                 pygame.quit()
                 sys.exit()
             
@@ -37,12 +60,13 @@ def main():
             
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_s:
-                    save_population(genetic_algorithm.population, "population.json")
-                    print("Population saved")
+                    # Written on a background thread so the frame loop doesn't stall
+                    checkpoint_writer.save(genetic_algorithm, POPULATION_FILE)
+                    print("Saving population")
                 if event.key == pygame.K_l:
                     try:
-                        genetic_algorithm.population = load_population("population.json")
-                        game.birds = genetic_algorithm.population
+                        layer_sizes, genomes, _ = load_saved_population()
+                        game.set_genomes(genomes, layer_sizes)
                         print("Population loaded")
                     except:
                         print("No saved population found")
@@ -51,21 +75,167 @@ def main():
         
         # Run game simulation
         game.update()
-        game.draw()
-        
-        # Draw settings panel
-        settings_panel.draw(game.screen)
         
         # If all birds except one are dead, create a new generation
         if game.all_birds_except_one_dead():
             print(f"Generation {generation} complete")
             print(f"Best fitness: {genetic_algorithm.calculate_best_fitness()}")
-            generation += 1
+            if metrics_log:
+                metrics_log.record(generation, genetic_algorithm.fitness, genetic_algorithm.genomes,
+                                   time.time() - generation_start, game.frame_counter, game.score, game.alive_curve)
+            checkpoint_writer.on_generation(generation, genetic_algorithm)
             genetic_algorithm.evolve()
             game.reset()
+            
+            # Evolving is counted towards the generation that was just played
+            if stats_log:
+                stats_log.write(generation, game.stats)
+            game.stats.reset()
+            generation += 1
+            generation_start = time.time()
         
-        clock.tick(60)
+        # Drawing runs at its own rate, so a fast simulation isn't held back by it
+        renderer.render(game, settings_panel, generation)
+        renderer.tick(generation)
+
+def run_replay(filename, generation=None):
+    """Play back a recorded generation (the last one by default) in a window.
+    
+    Space pauses, up/down change the speed, left/right seek by a keyframe
+    interval, home restarts and page up/down switch between generations.
+    """
+    replays = {replay.generation: replay for replay in read_replays(filename)}
+    if not replays:
+        print(f"No replays in {filename}")
+        return
+    generations = sorted(replays)
+    generation = generation if generation in replays else generations[-1]
+    
+    import pygame
+    pygame.init()
+    pygame.display.set_caption("Genetic Flappy Bird - Replay")
+    game = Game(fixed_timestep=1.0)
+    game.screen.fill((240, 240, 240))
+    player = ReplayPlayer(replays[generation], game)
+    speed = 1
+    paused = False
+    clock = pygame.time.Clock()
+    
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                if event.key == pygame.K_UP:
+                    speed = min(speed * 2, 128)
+                if event.key == pygame.K_DOWN:
+                    speed = max(speed // 2, 1)
+                if event.key == pygame.K_RIGHT:
+                    player.seek(player.frame + REPLAY_KEYFRAMES)
+                if event.key == pygame.K_LEFT:
+                    player.seek(player.frame - REPLAY_KEYFRAMES)
+                if event.key == pygame.K_HOME:
+                    player.seek(0)
+                if event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                    index = generations.index(generation) + (1 if event.key == pygame.K_PAGEUP else -1)
+                    generation = generations[max(0, min(index, len(generations) - 1))]
+                    player = ReplayPlayer(replays[generation], game)
+        
+        if not paused:
+            player.step(speed)
+        
+        game.draw()
+        replay = player.replay
+        game.screen.blit(game.text.render(f'Generation {replay.generation}, frame {player.frame}/{replay.frames}'), (10, 100))
+        game.screen.blit(game.text.render(f'Replay speed: {speed}x{" (paused)" if paused else ""}'), (10, 130))
         pygame.display.flip()
+        clock.tick(60)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genetic Flappy Bird")
+    parser.add_argument("--headless", action="store_true", help="train without opening a window")
+    parser.add_argument("--generations", type=int, default=100, help="generations to train in headless mode")
+    parser.add_argument("--max-steps", type=int, default=20000, help="frame limit per generation in headless mode")
+    parser.add_argument("--fitness-cap", type=float, help="stop simulating birds once they reach this fitness in headless mode")
+    parser.add_argument("--top-k", type=int, default=1, help="end a generation once at most this many birds are alive in headless mode")
+    parser.add_argument("--mutation-rate", type=float, default=0.1, help="mutation rate in headless mode")
+    parser.add_argument("--load", metavar="FILE", help="population file (.bin or .json) to start headless training from")
+    parser.add_argument("--save", metavar="FILE", help="save the final population to FILE in headless mode (.json for JSON export)")
+    parser.add_argument("--workers", type=int, help="evaluate each generation on this many processes in headless mode")
+    parser.add_argument("--episodes", type=int, default=1, help="courses each bird flies per generation in headless mode, all at once")
+    parser.add_argument("--aggregate", choices=AGGREGATES, default=EPISODE_AGGREGATE, help="how the fitness of several episodes is combined")
+    parser.add_argument("--quantile", type=float, default=EPISODE_QUANTILE, help="quantile used by --aggregate quantile")
+    parser.add_argument("--fitness-cache", type=float, nargs="?", const=FITNESS_CACHE_MB, metavar="MB", help="reuse the fitness of genomes that already flew a course, in a cache of at most MB megabytes (best with --fixed-course)")
+    parser.add_argument("--islands", type=int, help="evolve this many separate populations in parallel processes in headless mode")
+    parser.add_argument("--migration-interval", type=int, default=10, metavar="M", help="generations between migrations with --islands")
+    parser.add_argument("--migrants", type=int, default=2, help="best birds each island sends to the next one with --islands")
+    parser.add_argument("--adaptive", action="store_true", help="adapt the mutation rate to the share of children beating their parents in headless mode")
+    parser.add_argument("--generation-budget", type=float, metavar="SECONDS", help="with --adaptive, resize the population so a generation takes about this long")
+    parser.add_argument("--selection", choices=sorted(SELECTION_STRATEGIES), default=SELECTION, help="parent selection strategy in headless mode")
+    parser.add_argument("--elites", type=int, default=ELITE_COUNT, help="best birds kept unchanged each generation in headless mode")
+    parser.add_argument("--seed", type=int, help="seed for all random number streams, for reproducible runs")
+    parser.add_argument("--fixed-course", action="store_true", help="fly every generation through the same course")
+    parser.add_argument("--checkpoint-every", type=int, default=0, metavar="N", help="auto-checkpoint every N generations")
+    parser.add_argument("--checkpoint-keep", type=int, default=3, metavar="K", help="number of auto-checkpoints to keep")
+    parser.add_argument("--checkpoint-dir", default="checkpoints", help="directory for auto-checkpoints")
+    parser.add_argument("--checkpoint-delta", action="store_true", help="write auto-checkpoints as deltas against the previous one (.gfd)")
+    parser.add_argument("--keyframe-every", type=int, default=10, metavar="N", help="write a self-contained auto-checkpoint every N with --checkpoint-delta")
+    parser.add_argument("--stats", metavar="FILE", help="log time per phase and counters every generation to FILE (.csv or .jsonl)")
+    parser.add_argument("--record-replays", metavar="FILE", help="record the best birds' flights to FILE in headless mode")
+    parser.add_argument("--replay-every", type=int, default=1, metavar="N", help="record a replay every N generations")
+    parser.add_argument("--replay", metavar="FILE", help="play back a replay file instead of training")
+    parser.add_argument("--replay-generation", type=int, help="generation to play back, the last one recorded by default")
+    parser.add_argument("--metrics", metavar="FILE", help="append fitness statistics of every generation to FILE as JSON lines")
+    parser.add_argument("--fps", type=int, default=RENDER_FPS, help="most frames drawn per second in windowed mode")
+    parser.add_argument("--render-every", type=int, default=RENDER_EVERY, metavar="N", help="only draw every Nth generation in windowed mode, training the others at full speed")
+    parser.add_argument("--max-drawn-birds", type=int, default=MAX_DRAWN_BIRDS, metavar="N", help="most birds drawn per frame in windowed mode")
+    args = parser.parse_args(argv)
+    
+    # Islands run their own loop in worker processes, which has no room for these
+    if args.islands:
+        unsupported = {"--workers": args.workers, "--episodes": args.episodes != 1, "--stats": args.stats,
+                       "--metrics": args.metrics, "--record-replays": args.record_replays,
+                       "--checkpoint-every": args.checkpoint_every, "--checkpoint-delta": args.checkpoint_delta,
+                       "--fitness-cache": args.fitness_cache, "--adaptive": args.adaptive,
+                       "--generation-budget": args.generation_budget}
+        used = [flag for flag, value in unsupported.items() if value]
+        if used:
+            parser.error(f"{', '.join(used)} cannot be used with --islands")
+    
+    if args.replay:
+        run_replay(args.replay, args.replay_generation)
+        return
+    
+    checkpoint_writer = CheckpointWriter(args.checkpoint_dir, args.checkpoint_every, args.checkpoint_keep,
+                                         args.checkpoint_delta, args.keyframe_every)
+    streams = RandomStreams(args.seed, args.fixed_course)
+    stats_log = StatsLog(args.stats) if args.stats else None
+    metrics_log = MetricsLog(args.metrics) if args.metrics else None
+    
+    if args.headless:
+        scheduler = EpisodeScheduler(args.max_steps, args.fitness_cap, args.top_k)
+        if args.islands:
+            train_islands(args.generations, args.islands, args.migration_interval, args.migrants,
+                          args.mutation_rate, scheduler, args.load, args.save, args.selection, args.elites, streams)
+        else:
+            train(args.generations, args.mutation_rate, scheduler, args.load, args.save,
+                  args.workers, args.episodes, checkpoint_writer, args.selection, args.elites, streams,
+                  stats_log, metrics_log, args.aggregate, args.quantile,
+                  ReplayRecorder(args.record_replays, every=args.replay_every) if args.record_replays else None,
+                  FitnessCache(args.fitness_cache) if args.fitness_cache else None,
+                  AdaptiveController(args.generation_budget) if args.adaptive else None)
+        checkpoint_writer.close()
+        if stats_log:
+            stats_log.close()
+        if metrics_log:
+            metrics_log.close()
+    else:
+        from renderer import Renderer
+        run_windowed(checkpoint_writer, streams, Renderer(args.fps, args.render_every, args.max_drawn_birds), stats_log, metrics_log)
 
 if __name__ == "__main__":
     main()
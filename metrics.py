@@ -0,0 +1,94 @@
+import json
+import time
+import queue
+import threading
+import numpy as np
+
+class MetricsLog:
+    """Appends one JSON record per generation to a file, written on a background thread.
+
+    Records are computed on the calling thread, which only takes a few array
+    reductions, and then handed to the writer so the training loop never
+    waits on the disk. The file is only ever appended to and is flushed every
+    flush_every records, so a crashed run loses at most that many.
+    """
+
+    def __init__(self, filename, flush_every=100):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.queue = queue.Queue()
+        self.start_time = time.time()
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def record(self, generation, fitness, genomes, wall_time, steps=None, pipes=None, alive=None):
+        """Queue the metrics of a finished generation and return them.
+
+        steps, pipes and alive are the frames simulated, the pipes passed and
+        the sampled number of living birds of the generation's episode. They
+        are left out when the episode ran elsewhere, e.g. in worker processes.
+        """
+        record = {
+            "generation": generation,
+            "time": time.time() - self.start_time,
+            "wall_time": wall_time,
+            "steps": steps,
+            "steps_per_sec": steps / wall_time if steps is not None and wall_time > 0 else None,
+            "best": float(fitness.max()),
+            "mean": float(fitness.mean()),
+            "median": float(np.median(fitness)),
+            "pipes": pipes,
+            "alive": list(alive) if alive is not None else None,
+            "diversity": diversity(genomes),
+        }
+        self.queue.put(record)
+        return record
+
+    def _run(self):
+        with open(self.filename, 'a') as f:
+            pending = 0
+            while True:
+                record = self.queue.get()
+                try:
+                    if record is None:
+                        return
+                    f.write(json.dumps(record) + "\n")
+                    pending += 1
+                    if pending >= self.flush_every:
+                        f.flush()
+                        pending = 0
+                except Exception as e:
+                    print(f"Writing metrics failed: {e}")
+                finally:
+                    self.queue.task_done()
+
+    def close(self):
+        """Write the remaining records and stop the background thread."""
+        self.queue.put(None)
+        self.thread.join()
+
+def diversity(genomes):
+    """Average standard deviation of each parameter across the population."""
+    if len(genomes) < 2:
+        return 0.0
+    return float(genomes.std(axis=0).mean())
+
+def read_metrics(filename, fields=None, every=1):
+    """Lazily yield the records of a metrics log, one generation at a time.
+
+    fields limits each record to the given keys and every keeps only every
+    Nth record, so long histories can be plotted without loading them whole.
+    A partly written last line, e.g. from a run that is still going, is skipped.
+    """
+    with open(filename, 'r') as f:
+        for number, line in enumerate(f):
+            if number % every:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if fields is not None:
+                record = {key: record.get(key) for key in fields}
+            yield record
@@ -1,8 +1,10 @@
 import numpy as np
 import json
+from activations import ACTIVATIONS
+from config import ACTIVATION, OUTPUT_ACTIVATION
 
 class NeuralNetwork:
-    def __init__(self, layer_sizes=None, weights=None, biases=None):
+    def __init__(self, layer_sizes=None, weights=None, biases=None, rng=None):
         if weights and biases:
             self.weights = weights
             self.biases = biases
@@ -12,17 +14,22 @@ class NeuralNetwork:
             self.weights = []
             self.biases = []
             
-            # Initialize weights and biases with random values
+            # Initialize weights and biases with random values, from a fresh
+            # unseeded generator if none is given, never the global numpy state
+            rng = rng if rng is not None else np.random.default_rng()
             for i in range(len(layer_sizes) - 1):
-                self.weights.append(np.random.randn(layer_sizes[i+1], layer_sizes[i]))
-                self.biases.append(np.random.randn(layer_sizes[i+1], 1))
+                self.weights.append(rng.standard_normal((layer_sizes[i+1], layer_sizes[i])))
+                self.biases.append(rng.standard_normal((layer_sizes[i+1], 1)))
     
     def feedforward(self, inputs):
         """Feed inputs through the neural network to get outputs."""
         a = np.array(inputs).reshape(-1, 1)  # Convert to column vector
         
-        for w, b in zip(self.weights, self.biases):
-            a = self.sigmoid(np.dot(w, a) + b)
+        for layer, (w, b) in enumerate(zip(self.weights, self.biases)):
+            # The configured activation on hidden layers, the output activation on the last one
+            activation = OUTPUT_ACTIVATION if layer == len(self.weights) - 1 else ACTIVATION
+            z = np.dot(w, a) + b
+            a = ACTIVATIONS[activation](z, z)
         
         return a.flatten()  # Convert back to regular array
     
@@ -35,15 +42,40 @@ class NeuralNetwork:
         return NeuralNetwork(weights=[w.copy() for w in self.weights], 
                             biases=[b.copy() for b in self.biases])
     
-    def mutate(self, rate):
-        """Mutate weights and biases by a random amount."""
+    def mutate(self, rate, rng=None):
+        """Mutate weights and biases by a random amount drawn from rng, a numpy Generator."""
+        rng = rng if rng is not None else np.random.default_rng()
         for i in range(len(self.weights)):
             # Apply random mutations with probability 'rate'
-            mask = np.random.random(self.weights[i].shape) < rate
-            self.weights[i] += mask * np.random.randn(*self.weights[i].shape)
+            mask = rng.random(self.weights[i].shape) < rate
+            self.weights[i] += mask * rng.standard_normal(self.weights[i].shape)
             
-            mask = np.random.random(self.biases[i].shape) < rate
-            self.biases[i] += mask * np.random.randn(*self.biases[i].shape)
+            mask = rng.random(self.biases[i].shape) < rate
+            self.biases[i] += mask * rng.standard_normal(self.biases[i].shape)
+    
+    def flatten(self):
+        """Return all weights and biases as one flat array, layer by layer."""
+        return np.concatenate([p.ravel() for w, b in zip(self.weights, self.biases) for p in (w, b)])
+    
+    @classmethod
+    def from_flat(cls, layer_sizes, flat):
+        """Create a neural network whose weights and biases are views into a flat array."""
+        weights = []
+        biases = []
+        offset = 0
+        
+        for n_in, n_out in zip(layer_sizes[:-1], layer_sizes[1:]):
+            weights.append(flat[offset:offset + n_out * n_in].reshape(n_out, n_in))
+            offset += n_out * n_in
+            biases.append(flat[offset:offset + n_out].reshape(n_out, 1))
+            offset += n_out
+        
+        return cls(weights=weights, biases=biases)
+    
+    @staticmethod
+    def parameter_count(layer_sizes):
+        """Number of values in the flat representation of a network with these layer sizes."""
+        return sum(n_out * (n_in + 1) for n_in, n_out in zip(layer_sizes[:-1], layer_sizes[1:]))
     
     def to_dict(self):
         """Convert neural network to dictionary for JSON serialization."""
@@ -0,0 +1,108 @@
+import os
+import numpy as np
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from game import Game
+from course import SharedCourses, load_shared_course
+from scheduler import EpisodeScheduler
+from evaluation import evaluate_episodes, aggregate_fitness
+from config import COURSE_LENGTH, EPISODE_AGGREGATE, EPISODE_QUANTILE
+
+@lru_cache(maxsize=None)
+def worker_game():
+    """Headless game kept for the lifetime of a worker process, so blocks don't rebuild one each."""
+    return Game(headless=True)
+
+def evaluate_genomes(layer_sizes, genomes, course_handles, scheduler):
+    """Fly a block of genomes through every course and return (fitness, trajectory).
+
+    fitness is an (episodes, genomes) matrix and trajectory the fitness of
+    the block's birds still flying after every step, see
+    EpisodeScheduler.cut_short. This is the worker entry point, so it only
+    receives plain arrays and references to the courses in shared memory.
+    """
+    # Every block evaluated on the same course handles flies through the same pipes
+    courses = [load_shared_course(handle) for handle in course_handles]
+    trajectory = []
+    fitness = evaluate_episodes(worker_game(), genomes, layer_sizes, courses, scheduler, trajectory=trajectory)
+    return fitness, np.array(trajectory).reshape(-1, len(courses))
+
+def merge_trajectories(trajectories, episodes):
+    """Combine the trajectories of several blocks, which agree wherever both have birds flying."""
+    merged = np.full((max((len(t) for t in trajectories), default=0), episodes), np.nan)
+    for trajectory in trajectories:
+        np.fmax(merged[:len(trajectory)], trajectory, out=merged[:len(trajectory)])
+    return merged
+
+class ParallelEvaluator:
+    """Evaluates a population across a pool of worker processes.
+
+    The top_k rule of the scheduler is about the whole population, not one
+    worker's block of it, so the workers fly until all of their birds have
+    crashed or max_steps is reached and the rule is applied to the combined
+    result. That gives the same fitness as a serial evaluation, at the cost
+    of flying the best birds of each block for longer.
+
+    With a FitnessCache, genomes that already flew these courses aren't sent
+    to the workers; the cache is kept in this process.
+    """
+
+    def __init__(self, workers=None, episodes=1, scheduler=None, aggregate=EPISODE_AGGREGATE, quantile=EPISODE_QUANTILE,
+                 cache=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.episodes = episodes
+        self.scheduler = scheduler or EpisodeScheduler()
+        self.aggregate = aggregate
+        self.quantile = quantile
+        self.cache = cache
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        # Courses published for the last evaluation, reused while the seeds stay the same
+        self.courses = None
+
+        # The episodes run in the workers, so unlike BatchedEvaluator there is nothing to report
+        self.steps = None
+        self.score = None
+        self.alive_curve = None
+
+    def evaluate(self, genomes, layer_sizes, course_seeds):
+        """Return the fitness of every genome, aggregated over one episode per course seed."""
+        if self.courses is None or self.courses.seeds != list(course_seeds):
+            if self.courses is not None:
+                self.courses.close()
+            self.courses = SharedCourses(course_seeds, COURSE_LENGTH)
+
+        if self.cache is not None:
+            hashes, known, missing, _ = self.cache.split(genomes, course_seeds, self.scheduler.top_k)
+            flown = genomes[missing]
+        else:
+            flown = genomes
+
+        # Each worker flies its block through all courses at once, at most one block per worker
+        handles = [self.courses.handle(course_seed) for course_seed in course_seeds]
+        blocks = np.array_split(flown, min(self.workers, len(flown))) if len(flown) else []
+        futures = [self.executor.submit(evaluate_genomes, layer_sizes, block, handles, self.scheduler.without_top_k())
+                   for block in blocks]
+        results = [future.result() for future in futures]
+
+        fitness = np.concatenate([block_fitness for block_fitness, _ in results] or [np.empty((len(course_seeds), 0))],
+                                 axis=1)
+        if self.cache is not None:
+            # Flown to the end, so more of them are final than in a serial evaluation
+            fitness = self.cache.merge(hashes, known, missing, course_seeds, fitness, self.scheduler.fitness_cap)
+
+        trajectory = merge_trajectories([block_trajectory for _, block_trajectory in results], len(course_seeds))
+        fitness = self.scheduler.cut_short(fitness, trajectory)
+        return aggregate_fitness(fitness, self.aggregate, self.quantile)
+
+    def close(self):
+        self.executor.shutdown()
+        if self.courses is not None:
+            self.courses.close()
+            self.courses = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
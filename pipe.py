@@ -1,19 +1,32 @@
-import pygame
-from config import SCREEN_HEIGHT, GAME_WIDTH, PIPE_GAP
+from world import array_property
+from config import SCREEN_HEIGHT, GAME_WIDTH, PIPE_GAP, PIPE_WIDTH, PIPE_SPEED
 
 class Pipe:
+    # Pipes created by the game are views onto a slot of the World ring buffer
+    x = array_property("x", "pipe_x", float)
+    gap_y = array_property("gap_y", "pipe_gap_y", float)
+    passed = array_property("passed", "pipe_passed", bool)
+    
     def __init__(self, x, gap_y):
+        self.world = None
+        self.index = None
         self.x = x
         self.gap_y = gap_y
-        self.width = 60
-        self.speed = 5
+        self.width = PIPE_WIDTH
+        self.speed = PIPE_SPEED
         self.color = (0, 128, 0)  # Green
         self.passed = False
     
+    def bind(self, world, slot):
+        """Read and write this pipe's state from slot of the world's ring buffer."""
+        self.world = world
+        self.index = slot
+    
     def update(self, delta_time=1.0):
         self.x -= self.speed * delta_time
     
     def draw(self, screen):
+        import pygame
         # Draw top pipe
         pygame.draw.rect(screen, self.color, (self.x, 0, self.width, self.gap_y))
         
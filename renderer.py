@@ -0,0 +1,68 @@
+import time
+import pygame
+from config import RENDER_FPS, RENDER_EVERY, MAX_DRAWN_BIRDS
+
+class TextCache:
+    """Rendered text surfaces, so labels are only re-rendered when their text changes."""
+
+    def __init__(self, font, color=(0, 0, 0), max_size=256):
+        self.font = font
+        self.color = color
+        self.max_size = max_size
+        self.surfaces = {}
+
+    def render(self, text):
+        surface = self.surfaces.get(text)
+        if surface is None:
+            # Counters produce a new string every frame, so don't let the cache grow forever
+            if len(self.surfaces) >= self.max_size:
+                self.surfaces.clear()
+            surface = self.font.render(text, True, self.color)
+            self.surfaces[text] = surface
+        return surface
+
+class Renderer:
+    """Decides when the window is redrawn, independently of the simulation.
+
+    The simulation can step as often as it likes; frames are drawn at most
+    fps times a second, the game area only every Nth generation, and at most
+    max_birds birds per frame. Only the screen areas that were redrawn are
+    pushed to the display.
+    """
+
+    def __init__(self, fps=RENDER_FPS, every=RENDER_EVERY, max_birds=MAX_DRAWN_BIRDS):
+        self.fps = fps
+        self.every = max(1, every)
+        self.max_birds = max_birds
+        self.clock = pygame.time.Clock()
+        self.last_frame = 0.0
+
+    def watching(self, generation):
+        """Whether the game area is drawn during this generation."""
+        # Generations count from 1 and the first one is always shown
+        return (generation - 1) % self.every == 0
+
+    def frame_due(self):
+        return time.perf_counter() - self.last_frame >= 1 / self.fps
+
+    def render(self, game, settings_panel, generation):
+        """Draw a frame if one is due, pushing only the changed areas to the display."""
+        # While watching, tick() already holds the loop to the frame rate
+        watching = self.watching(generation)
+        if not watching and not self.frame_due():
+            return
+
+        dirty = []
+        if watching:
+            dirty.append(game.draw(self.max_birds))
+        dirty.append(settings_panel.draw(game.screen))
+
+        dirty = [rect for rect in dirty if rect is not None]
+        if dirty:
+            pygame.display.update(dirty)
+        self.last_frame = time.perf_counter()
+
+    def tick(self, generation):
+        """Hold the loop to the frame rate while the game is being watched, otherwise run flat out."""
+        if self.watching(generation):
+            self.clock.tick(self.fps)
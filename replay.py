@@ -0,0 +1,168 @@
+import struct
+import numpy as np
+from game import Game
+from selection import elites
+from world import LAYER_SIZES
+from neural_network import NeuralNetwork
+from config import REPLAY_BIRDS, REPLAY_MAX_FRAMES, REPLAY_KEYFRAMES
+
+# Replay file layout, one record per replayed generation:
+#   magic, version, generation, course seed, birds, frames  (REPLAY_HEADER)
+#   fitness of each bird at the end of the replay             (float64, one per bird)
+#   jump decisions packed 8 frames to a byte                  (uint8, ceil(frames / 8) x birds)
+# The simulation is deterministic, so the course seed and the jumps are all
+# it takes to fly the birds again, at about one bit per bird per frame.
+REPLAY_MAGIC = b"GFBR"
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct("<4sIIQII")
+
+class Replay:
+    """One recorded generation: the best birds' jumps through one course."""
+
+    def __init__(self, generation, course_seed, fitness, packed_jumps, frames):
+        self.generation = generation
+        self.course_seed = course_seed
+        self.fitness = fitness
+        self.packed_jumps = packed_jumps
+        self.frames = frames
+
+    @property
+    def birds(self):
+        return len(self.fitness)
+
+    def jumps(self):
+        """(frames, birds) bool array of jump decisions."""
+        return np.unpackbits(self.packed_jumps, axis=0, count=self.frames).astype(bool)
+
+def record_jumps(layer_sizes, genomes, course_seed, frames):
+    """Fly the given genomes through a course again and return their (frames, birds) jumps and fitness.
+
+    Birds don't affect each other, so a few birds flown on their own make
+    exactly the same decisions as they did among the whole population.
+    """
+    game = Game(headless=True)
+    game.set_genomes(np.array(genomes, dtype=float), layer_sizes)
+    game.reset(course_seed)
+    game.jump_log = np.zeros((frames, len(genomes)), dtype=bool)
+
+    while game.frame_counter < frames and not game.all_birds_dead():
+        game.update()
+
+    return game.jump_log[:game.frame_counter], game.world.bird_fitness.copy()
+
+class ReplayRecorder:
+    """Appends replays of the best birds of every Nth generation to a file."""
+
+    def __init__(self, filename, birds=REPLAY_BIRDS, every=1):
+        self.filename = filename
+        self.birds = birds
+        self.every = every
+
+    def record(self, generation, layer_sizes, genomes, fitness, course_seed, frames=None):
+        """Record the best birds of an evaluated generation flying the course with course_seed.
+
+        frames should be the length of the training episode, so the replay
+        ends where the episode did.
+        """
+        if generation % self.every:
+            return
+
+        top = elites(fitness, self.birds)
+        jumps, replay_fitness = record_jumps(layer_sizes, genomes[top], course_seed, frames or REPLAY_MAX_FRAMES)
+
+        with open(self.filename, 'ab') as f:
+            f.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, generation, course_seed, len(top), len(jumps)))
+            f.write(replay_fitness.astype("<f8").tobytes())
+            f.write(np.packbits(jumps, axis=0).tobytes())
+
+def read_replays(filename):
+    """Yield the Replay records of a file in the order they were written."""
+    with open(filename, 'rb') as f:
+        while True:
+            header = f.read(REPLAY_HEADER.size)
+            if len(header) < REPLAY_HEADER.size:
+                return
+
+            magic, version, generation, course_seed, birds, frames = REPLAY_HEADER.unpack(header)
+            if magic != REPLAY_MAGIC:
+                raise ValueError(f"{filename} is not a replay file")
+            if version != REPLAY_VERSION:
+                raise ValueError(f"Unsupported replay version {version}")
+
+            fitness = np.frombuffer(f.read(8 * birds), dtype="<f8")
+            packed = np.frombuffer(f.read((frames + 7) // 8 * birds), dtype=np.uint8).reshape(-1, birds)
+            yield Replay(generation, course_seed, fitness, packed, frames)
+
+# Game and world state that changes during an episode, saved in keyframes
+GAME_STATE = ("frame_counter", "pipes_spawned", "score", "alive_curve")
+WORLD_STATE = ("bird_y", "bird_velocity", "bird_alive", "bird_fitness", "active",
+               "pipe_x", "pipe_gaps", "pipe_passed", "pipe_head", "pipe_count")
+
+class ReplayPlayer:
+    """Flies the birds of a replay again in a game, with seeking.
+
+    A snapshot of the game is kept every keyframe_interval frames while
+    playing, so seeking restores the nearest earlier snapshot and only
+    simulates the frames from there.
+    """
+
+    def __init__(self, replay, game=None, keyframe_interval=REPLAY_KEYFRAMES):
+        self.replay = replay
+        self.game = game or Game(headless=True)
+        self.keyframe_interval = keyframe_interval
+
+        # The brains are never asked, the birds just need a population to exist
+        self.game.set_genomes(np.zeros((replay.birds, NeuralNetwork.parameter_count(LAYER_SIZES))), LAYER_SIZES)
+        self.game.reset(replay.course_seed)
+        self.game.jump_script = replay.jumps()
+
+        self.keyframes = {}
+        self.save_keyframe()
+
+    @property
+    def frame(self):
+        return self.game.frame_counter
+
+    @property
+    def finished(self):
+        return self.frame >= self.replay.frames or self.game.all_birds_dead()
+
+    def step(self, frames=1):
+        """Simulate up to the given number of frames, stopping at the end of the replay."""
+        self.game.speed = 1
+        for _ in range(frames):
+            if self.finished:
+                return
+            self.game.update()
+            if self.frame % self.keyframe_interval == 0:
+                self.save_keyframe()
+
+    def seek(self, frame):
+        """Jump to the given frame of the replay."""
+        frame = max(0, min(frame, self.replay.frames))
+        keyframe = max(k for k in self.keyframes if k <= frame)
+
+        # Simulate on from where we are unless going back or a keyframe is closer
+        if self.frame > frame or self.frame < keyframe:
+            self.restore_keyframe(keyframe)
+        self.step(frame - self.frame)
+
+    def save_keyframe(self):
+        game, world = self.game, self.game.world
+        self.keyframes[self.frame] = ({name: _copy(getattr(game, name)) for name in GAME_STATE},
+                                      {name: _copy(getattr(world, name)) for name in WORLD_STATE})
+
+    def restore_keyframe(self, frame):
+        game_state, world_state = self.keyframes[frame]
+        for name, value in game_state.items():
+            setattr(self.game, name, _copy(value))
+        for name, value in world_state.items():
+            setattr(self.game.world, name, _copy(value))
+        # The ring may have a different capacity than when the views were made
+        self.game.world._pipe_views = [None] * self.game.world.pipe_capacity
+
+def _copy(value):
+    # Snapshots must not share arrays or lists with the live game
+    if isinstance(value, (np.ndarray, list)):
+        return value.copy()
+    return value
@@ -0,0 +1,44 @@
+import numpy as np
+
+class RandomStreams:
+    """Independent random number generators for each source of randomness in a run.
+
+    Every component draws from its own numpy Generator, all derived from one
+    seed, so a run is reproducible and adding draws to one component never
+    shifts the numbers another one sees. With fixed_course, every episode
+    flies through the same course(s), which takes course luck out of fitness
+    comparisons between generations.
+    """
+
+    STREAMS = ("course", "init", "mutation", "selection")
+
+    def __init__(self, seed=None, fixed_course=False):
+        # seed can also be a SeedSequence handed down by spawn()
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.fixed_course = fixed_course
+
+        for name, child in zip(self.STREAMS, self.seed_sequence.spawn(len(self.STREAMS))):
+            setattr(self, name, np.random.default_rng(child))
+
+        self._fixed_course_seeds = []
+
+    def course_seeds(self, count):
+        """Seeds for the courses of the next count episodes."""
+        if not self.fixed_course:
+            return self.course.integers(0, 2**63, count).tolist()
+
+        # Always hand out the same seeds, drawing more only when more episodes are asked for
+        while len(self._fixed_course_seeds) < count:
+            self._fixed_course_seeds.append(int(self.course.integers(0, 2**63)))
+        return self._fixed_course_seeds[:count]
+
+    def spawn(self, count):
+        """Independent child streams, e.g. one per worker process.
+
+        The SeedSequences are returned rather than RandomStreams so they can
+        be sent to other processes cheaply and turned into streams there.
+        """
+        return self.seed_sequence.spawn(count)
@@ -0,0 +1,105 @@
+import numpy as np
+
+class EpisodeScheduler:
+    """Decides when an evaluation episode is over.
+
+    An episode ends when any of these hold:
+      - max_steps frames have been simulated,
+      - at most top_k birds are still flying. Birds that are alive together
+        have earned the same fitness and always stay ahead of the dead ones,
+        so from then on the set of top_k birds can no longer change.
+        top_k=1 is the game's usual "all birds except one dead" rule and
+        top_k=0 runs until every bird has crashed.
+    Birds reaching fitness_cap are retired on the spot with exactly the cap,
+    so one strong controller can't keep an episode running forever.
+    When the world flies several courses in lanes, the top_k rule applies
+    to every lane on its own: a lane's remaining birds are retired once it
+    is over, and the episode ends when all lanes are. Ghosts of birds whose
+    fitness came from a FitnessCache count as flying for the top_k rule.
+    A population flown in separate parts, e.g. by worker processes, flies
+    with top_k=0 and has the top_k rule applied afterwards by cut_short.
+    """
+
+    def __init__(self, max_steps=None, fitness_cap=None, top_k=1):
+        self.max_steps = max_steps
+        self.fitness_cap = fitness_cap
+        self.top_k = top_k
+
+    def finished(self, game, steps):
+        if self.max_steps is not None and steps >= self.max_steps:
+            return True
+        if game.world.lanes > 1:
+            self.retire_finished_lanes(game.world)
+            return len(game.world.active) == 0
+        if game.world.ghost_fitness is not None:
+            return len(game.world.active) + game.world.ghosts_flying()[0] <= self.top_k
+        return len(game.world.active) <= self.top_k
+
+    def retire_finished_lanes(self, world):
+        """Stop simulating the birds of lanes with at most top_k birds left."""
+        active = world.active
+        lanes = world.bird_lane[active]
+        alive = np.bincount(lanes, minlength=world.lanes)
+        if world.ghost_fitness is not None:
+            alive += world.ghosts_flying()
+        done = alive[lanes] <= self.top_k
+        if done.any():
+            world.kill(active[done])
+
+    def retire_capped(self, world):
+        """Stop simulating birds that have reached the fitness cap."""
+        active = world.active
+        capped = active[world.bird_fitness[active] >= self.fitness_cap]
+        if len(capped):
+            world.bird_fitness[capped] = self.fitness_cap
+            world.kill(capped)
+
+    def run(self, game, trajectory=None):
+        """Step the game until the episode is over and return the number of frames simulated.
+
+        If trajectory is a list, World.lane_fitness is appended to it before
+        the first step and after every step, for cut_short.
+        """
+        steps = 0
+        if trajectory is not None:
+            trajectory.append(game.world.lane_fitness())
+
+        while not self.finished(game, steps):
+            game.update()
+            steps += 1
+
+            if self.fitness_cap is not None:
+                self.retire_capped(game.world)
+            if trajectory is not None:
+                trajectory.append(game.world.lane_fitness())
+
+        return steps
+
+    def without_top_k(self):
+        """A scheduler with the same limits that flies until every bird has crashed."""
+        return EpisodeScheduler(self.max_steps, self.fitness_cap, 0)
+
+    def cut_short(self, fitness, trajectory):
+        """Apply the top_k rule to an (episodes, birds) fitness matrix flown with without_top_k().
+
+        trajectory is a (steps + 1, episodes) array of the fitness of the
+        birds still flying after every step, as recorded by run. Every bird
+        with at least that fitness was still in the air then, so the step the
+        top_k rule would have ended each episode at can be found, and the
+        birds still flying at that step are cut back to the fitness they had.
+        The result is the same as flying the whole population together.
+        """
+        if not self.top_k or len(trajectory) == 0:
+            return fitness
+
+        fitness = fitness.copy()
+        for episode, flying in zip(fitness, trajectory.T):
+            flying = flying[~np.isnan(flying)]
+            alive = len(episode) - np.searchsorted(np.sort(episode), flying)
+            over = np.flatnonzero(alive <= self.top_k)
+            if len(over):
+                np.minimum(episode, flying[over[0]], out=episode)
+        return fitness
+
+    def __repr__(self):
+        return f"EpisodeScheduler(max_steps={self.max_steps}, fitness_cap={self.fitness_cap}, top_k={self.top_k})"
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Parent selection strategies.
+#
+# Each strategy takes a fitness array, the number of parents to pick and a
+# numpy Generator, and returns an array of population indices. They are all
+# vectorized, so picking n parents costs O(n log n) at most.
+
+def roulette(fitness, count, rng):
+    """Fitness-proportionate selection."""
+    total = fitness.sum()
+    if total <= 0:
+        # If all fitness scores are zero, select randomly
+        return rng.integers(0, len(fitness), count)
+
+    cumulative = np.cumsum(fitness)
+    # side="right" skips over birds with zero fitness
+    picks = np.searchsorted(cumulative, rng.random(count) * total, side="right")
+    return np.minimum(picks, len(fitness) - 1)
+
+def stochastic_universal_sampling(fitness, count, rng):
+    """Fitness-proportionate selection with evenly spaced pointers, so it has less variance than roulette."""
+    total = fitness.sum()
+    if total <= 0:
+        return rng.integers(0, len(fitness), count)
+
+    step = total / count
+    pointers = rng.uniform(0, step) + step * np.arange(count)
+    picks = np.minimum(np.searchsorted(np.cumsum(fitness), pointers, side="right"), len(fitness) - 1)
+
+    # The pointers come out in population order, shuffle so pairings are random
+    return rng.permutation(picks)
+
+def tournament(fitness, count, rng, size=3):
+    """Pick the fittest of size random birds, count times."""
+    contenders = rng.integers(0, len(fitness), (count, size))
+    winners = np.argmax(fitness[contenders], axis=1)
+    return contenders[np.arange(count), winners]
+
+def rank(fitness, count, rng):
+    """Selection proportional to rank, which ignores how far ahead the leaders are."""
+    ranks = np.empty(len(fitness))
+    ranks[np.argsort(fitness, kind="stable")] = np.arange(1, len(fitness) + 1)
+    return roulette(ranks, count, rng)
+
+def elites(fitness, count):
+    """Indices of the count fittest birds, best first."""
+    count = min(count, len(fitness))
+    if count == 0:
+        return np.empty(0, dtype=int)
+
+    top = np.argpartition(fitness, len(fitness) - count)[len(fitness) - count:]
+    return top[np.argsort(fitness[top])[::-1]]
+
+SELECTION_STRATEGIES = {
+    "roulette": roulette,
+    "sus": stochastic_universal_sampling,
+    "tournament": tournament,
+    "rank": rank,
+}
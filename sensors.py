@@ -0,0 +1,63 @@
+import numpy as np
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, PIPE_GAP, BIRD_SIZE, JUMP_FORCE, SENSORS, SENSOR_LOOKAHEAD
+
+# Features of the bird itself, from the world and the indices of the birds
+BIRD_FEATURES = {
+    "y": lambda world, indices: world.bird_y[indices] / SCREEN_HEIGHT,
+    "velocity": lambda world, indices: world.bird_velocity[indices] / (2 * abs(JUMP_FORCE)),
+}
+
+# Features of one pipe ahead, from its x, its gap height (one per bird when
+# flying in lanes) and the birds' y
+PIPE_FEATURES = {
+    "pipe_x": lambda x, gap_y, y: x / SCREEN_WIDTH,
+    "gap_top": lambda x, gap_y, y: gap_y / SCREEN_HEIGHT,
+    "gap_bottom": lambda x, gap_y, y: (gap_y + PIPE_GAP) / SCREEN_HEIGHT,
+    "gap_center": lambda x, gap_y, y: (gap_y + PIPE_GAP / 2 - y - BIRD_SIZE / 2) / SCREEN_HEIGHT,
+}
+
+# Stand-in for a looked-ahead pipe that hasn't spawned yet: at the spawn point with a centered gap
+MISSING_PIPE = (SCREEN_WIDTH, (SCREEN_HEIGHT - PIPE_GAP) / 2)
+
+class Sensors:
+    """Computes the network inputs of many birds at once as one (birds, count) matrix.
+
+    features names bird and pipe features in input order, every feature is
+    scaled to roughly [0, 1] (or [-1, 1] for signed ones). Pipe features are
+    repeated for each of the lookahead pipes ahead of the birds, so count is
+    the input layer size of the brains.
+    """
+
+    def __init__(self, features=SENSORS, lookahead=SENSOR_LOOKAHEAD):
+        for name in features:
+            if name not in BIRD_FEATURES and name not in PIPE_FEATURES:
+                raise ValueError(f"Unknown sensor: {name}")
+
+        self.features = list(features)
+        self.lookahead = lookahead
+        self.count = sum(lookahead if name in PIPE_FEATURES else 1 for name in self.features)
+
+        # Reused between steps, the networks copy the inputs before the next call
+        self._buffer = np.empty((0, self.count))
+
+    def sense(self, world, indices, next_slot):
+        rows = len(indices)
+        if len(self._buffer) < rows:
+            self._buffer = np.empty((rows, self.count))
+        inputs = self._buffer[:rows]
+
+        y = world.bird_y[indices]
+        pipes = [MISSING_PIPE if slot is None else (world.pipe_x[slot], world.gap_y(indices, slot))
+                 for slot in world.pipes_after(next_slot, self.lookahead)]
+
+        column = 0
+        for name in self.features:
+            if name in BIRD_FEATURES:
+                inputs[:, column] = BIRD_FEATURES[name](world, indices)
+                column += 1
+            else:
+                for x, gap_y in pipes:
+                    inputs[:, column] = PIPE_FEATURES[name](x, gap_y, y)
+                    column += 1
+
+        return inputs
@@ -1,6 +1,8 @@
+import time
 import pygame
-from config import GAME_WIDTH, SCREEN_WIDTH, SCREEN_HEIGHT
-from utils import save_population, load_population
+from config import GAME_WIDTH, SCREEN_WIDTH, SCREEN_HEIGHT, POPULATION_FILE
+from utils import load_saved_population
+from renderer import TextCache
 
 class Button:
     def __init__(self, x, y, width, height, text, color=(200, 200, 200), hover_color=(150, 150, 150)):
@@ -10,18 +12,22 @@ class Button:
         self.hover_color = hover_color
         self.is_hovered = False
         self.font = pygame.font.SysFont('Arial', 16)
+        self.text_cache = TextCache(self.font)
         
     def draw(self, screen):
         color = self.hover_color if self.is_hovered else self.color
         pygame.draw.rect(screen, color, self.rect)
         pygame.draw.rect(screen, (0, 0, 0), self.rect, 2)  # Border
         
-        text_surface = self.font.render(self.text, True, (0, 0, 0))
+        text_surface = self.text_cache.render(self.text)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
         
     def check_hover(self, mouse_pos):
+        """Update the hover state and return True if it changed."""
+        was_hovered = self.is_hovered
         self.is_hovered = self.rect.collidepoint(mouse_pos)
+        return self.is_hovered != was_hovered
         
     def is_clicked(self, mouse_pos, mouse_click):
         return self.rect.collidepoint(mouse_pos) and mouse_click
@@ -34,6 +40,7 @@ class Slider:
         self.value = initial_val
         self.text = text
         self.font = pygame.font.SysFont('Arial', 16)
+        self.text_cache = TextCache(self.font)
         self.active = False
         
     def draw(self, screen):
@@ -47,7 +54,7 @@ class Slider:
         pygame.draw.rect(screen, (100, 100, 100), handle_rect)
         
         # Draw text and value
-        text_surface = self.font.render(f"{self.text}: {self.value:.2f}", True, (0, 0, 0))
+        text_surface = self.text_cache.render(f"{self.text}: {self.value:.2f}")
         screen.blit(text_surface, (self.rect.x, self.rect.y - 20))
         
     def update(self, mouse_pos):
@@ -66,8 +73,9 @@ class Slider:
             self.active = False
 
 class SettingsPanel:
-    def __init__(self, genetic_algorithm):
+    def __init__(self, genetic_algorithm, checkpoint_writer):
         self.genetic_algorithm = genetic_algorithm
+        self.checkpoint_writer = checkpoint_writer
         self.x = GAME_WIDTH
         self.width = SCREEN_WIDTH - GAME_WIDTH
         self.height = SCREEN_HEIGHT
@@ -84,14 +92,33 @@ class SettingsPanel:
         self.show_vectors_button = Button(self.x + 20, 300, 160, 40, "Toggle Vectors")
         self.genetic_algorithm.game.show_vectors = False
         
+        # Toggle for the performance overlay, refreshed twice a second while shown
+        self.show_stats_button = Button(self.x + 20, 360, 160, 40, "Show Stats")
+        self.show_stats = False
+        self.stats_font = pygame.font.SysFont('Arial', 13)
+        self.stats_text = TextCache(self.stats_font)
+        self.stats_refresh = 0.5
+        self.stats_drawn = 0.0
+        
+        self.title_text = self.font.render("Settings", True, (0, 0, 0))
+        
+        # The panel only changes on user input, so it is redrawn only when marked dirty
+        self.dirty = True
+        
     def draw(self, screen):
+        """Redraw the panel if anything on it changed and return its rectangle, else None."""
+        if self.show_stats and time.perf_counter() - self.stats_drawn >= self.stats_refresh:
+            self.dirty = True
+        if not self.dirty:
+            return None
+        self.dirty = False
+        
         # Draw panel background
         pygame.draw.rect(screen, self.bg_color, (self.x, 0, self.width, self.height))
         pygame.draw.line(screen, (0, 0, 0), (self.x, 0), (self.x, self.height), 2)
         
         # Draw title
-        title_text = self.font.render("Settings", True, (0, 0, 0))
-        screen.blit(title_text, (self.x + 20, 15))
+        screen.blit(self.title_text, (self.x + 20, 15))
         
         # Draw UI elements
         self.save_button.draw(screen)
@@ -99,14 +126,30 @@ class SettingsPanel:
         self.mutation_slider.draw(screen)
         self.speed_slider.draw(screen)
         self.show_vectors_button.draw(screen)
+        self.show_stats_button.draw(screen)
+        
+        if self.show_stats:
+            self.draw_stats(screen)
+        
+        return pygame.Rect(self.x, 0, self.width, self.height)
+        
+    def draw_stats(self, screen):
+        # Per-step phase times and counters for the current generation
+        for line_number, line in enumerate(self.genetic_algorithm.game.stats.summary()):
+            screen.blit(self.stats_text.render(line), (self.x + 20, 415 + line_number * 13))
+        self.stats_drawn = time.perf_counter()
         
     def handle_event(self, event):
         mouse_pos = pygame.mouse.get_pos()
         
+        # The window was uncovered, so the panel has to be drawn again
+        if event.type == pygame.VIDEOEXPOSE:
+            self.dirty = True
+        
         # Update button hover states
-        self.save_button.check_hover(mouse_pos)
-        self.load_button.check_hover(mouse_pos)
-        self.show_vectors_button.check_hover(mouse_pos)
+        for button in (self.save_button, self.load_button, self.show_vectors_button, self.show_stats_button):
+            if button.check_hover(mouse_pos):
+                self.dirty = True
         
         # Handle slider events
         self.mutation_slider.handle_event(event)
@@ -114,21 +157,22 @@ class SettingsPanel:
         
         if self.mutation_slider.update(mouse_pos):
             self.genetic_algorithm.mutation_rate = self.mutation_slider.value
+            self.dirty = True
             
         if self.speed_slider.update(mouse_pos):
             self.genetic_algorithm.game.speed = int(self.speed_slider.value)
+            self.dirty = True
         
         # Handle button clicks
         if event.type == pygame.MOUSEBUTTONDOWN:
             if self.save_button.is_clicked(mouse_pos, True):
-                save_population(self.genetic_algorithm.population, "population.json")
-                print("Population saved")
+                self.checkpoint_writer.save(self.genetic_algorithm, POPULATION_FILE)
+                print("Saving population")
             
             if self.load_button.is_clicked(mouse_pos, True):
                 try:
-                    population = load_population("population.json")
-                    self.genetic_algorithm.population = population
-                    self.genetic_algorithm.game.birds = population
+                    layer_sizes, genomes, _ = load_saved_population()
+                    self.genetic_algorithm.game.set_genomes(genomes, layer_sizes)
                     print("Population loaded")
                 except:
                     print("No saved population found")
@@ -136,3 +180,9 @@ class SettingsPanel:
             if self.show_vectors_button.is_clicked(mouse_pos, True):
                 self.genetic_algorithm.game.show_vectors = not self.genetic_algorithm.game.show_vectors
                 self.show_vectors_button.text = "Hide Vectors" if self.genetic_algorithm.game.show_vectors else "Show Vectors"
+                self.dirty = True
+            
+            if self.show_stats_button.is_clicked(mouse_pos, True):
+                self.show_stats = not self.show_stats
+                self.show_stats_button.text = "Hide Stats" if self.show_stats else "Show Stats"
+                self.dirty = True
@@ -0,0 +1,75 @@
+import os
+import csv
+import json
+from time import perf_counter
+
+# Phases of a simulation step, of drawing and of evolving a generation, in the order they run
+PHASES = ("pipes", "sense", "think", "physics", "collide", "reward", "draw",
+          "select", "crossover", "mutate", "swap")
+COUNTERS = ("steps", "forward_passes", "allocations")
+
+class Stats:
+    """Time spent in each phase of the game and the genetic algorithm, plus event counters.
+
+    Timing works by laps: start() marks the beginning of a stretch of work and
+    every lap(phase) adds the time since the previous mark to that phase, so
+    each phase costs one clock read. Totals accumulate until reset(), usually
+    once per generation.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self._mark = perf_counter()
+
+    def start(self):
+        self._mark = perf_counter()
+
+    def lap(self, phase):
+        now = perf_counter()
+        self.times[phase] += now - self._mark
+        self._mark = now
+
+    def count(self, counter, amount=1):
+        self.counts[counter] += amount
+
+    def snapshot(self):
+        """The current totals as one flat record, times in seconds."""
+        record = {f"{phase}_time": self.times[phase] for phase in PHASES}
+        record.update(self.counts)
+        return record
+
+    def summary(self):
+        """Lines describing where the time went, for on-screen display."""
+        steps = max(self.counts["steps"], 1)
+        lines = [f"{phase}: {self.times[phase] / steps * 1e6:.0f} us/step"
+                 for phase in PHASES if self.times[phase]]
+        lines += [f"{counter}: {self.counts[counter]}" for counter in COUNTERS]
+        return lines
+
+class StatsLog:
+    """Appends one Stats record per generation to a CSV or JSONL file, chosen by extension."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.csv = not filename.endswith(".jsonl")
+        new_file = not os.path.exists(filename) or os.path.getsize(filename) == 0
+
+        self.file = open(filename, 'a', newline='')
+        if self.csv:
+            self.writer = csv.writer(self.file)
+            if new_file:
+                self.writer.writerow(["generation"] + list(Stats().snapshot()))
+
+    def write(self, generation, stats):
+        record = stats.snapshot()
+        if self.csv:
+            self.writer.writerow([generation] + list(record.values()))
+        else:
+            self.file.write(json.dumps({"generation": generation, **record}) + "\n")
+
+    def close(self):
+        self.file.close()
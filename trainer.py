@@ -0,0 +1,131 @@
+import time
+from game import Game
+from genetic_algorithm import GeneticAlgorithm
+from parallel import ParallelEvaluator
+from evaluation import BatchedEvaluator
+from islands import IslandModel
+from scheduler import EpisodeScheduler
+from utils import save_population_genomes, load_population_genomes
+from config import SELECTION, ELITE_COUNT, EPISODE_AGGREGATE, EPISODE_QUANTILE
+
+def train(generations, mutation_rate=0.1, scheduler=None, population_file=None, save_file=None,
+          workers=None, episodes=1, checkpoint_writer=None, selection=SELECTION, elite_count=ELITE_COUNT,
+          streams=None, stats_log=None, metrics_log=None, aggregate=EPISODE_AGGREGATE, quantile=EPISODE_QUANTILE,
+          replay_recorder=None, fitness_cache=None, controller=None):
+    """Train for a number of generations without opening a window.
+    
+    With more than one episode, every bird flies that many courses at once
+    and its fitness is the given aggregate of them. With workers set, each
+    generation is evaluated by a pool of processes instead of in this process.
+    A checkpoint_writer gets the chance to auto-checkpoint every generation.
+    Pass seeded RandomStreams to make the run reproducible and an
+    EpisodeScheduler to bound how long each generation runs. A StatsLog
+    gets the time spent in each phase of every generation; with workers,
+    only evolving is timed and the MetricsLog gets no step counts, pipes or
+    alive curve, since the simulation runs in other processes.
+    A MetricsLog gets the fitness statistics of every generation and a
+    ReplayRecorder records how the best birds flew. With a FitnessCache,
+    genomes that already flew a course aren't flown through it again, which
+    pays off with a fixed course. An AdaptiveController adapts the mutation
+    rate and, given a time budget, the population size every generation.
+    """
+    scheduler = scheduler or EpisodeScheduler()
+    game = Game(headless=True, streams=streams)
+    genetic_algorithm = GeneticAlgorithm(game, mutation_rate, selection, elite_count, controller)
+
+    if population_file:
+        # The genomes go straight into the world, memory-mapped and with fresh bird state
+        layer_sizes, genomes, _ = load_population_genomes(population_file)
+        game.set_genomes(genomes, layer_sizes)
+        print(f"Loaded population from {population_file}")
+
+    evaluator = None
+    if workers:
+        evaluator = ParallelEvaluator(workers, episodes, scheduler, aggregate, quantile, fitness_cache)
+    elif episodes > 1 or fitness_cache is not None:
+        evaluator = BatchedEvaluator(episodes, scheduler, aggregate, quantile, fitness_cache, game.stats)
+
+    start_time = time.time()
+
+    for generation in range(1, generations + 1):
+        generation_start = time.time()
+        if evaluator:
+            course_seeds = game.streams.course_seeds(evaluator.episodes)
+            course_seed = course_seeds[0]
+            cache_hits = fitness_cache.hits if fitness_cache is not None else 0
+            genetic_algorithm.set_fitness(evaluator.evaluate(genetic_algorithm.genomes,
+                                                             genetic_algorithm.layer_sizes, course_seeds))
+            progress = f"{evaluator.episodes} episodes"
+            if workers:
+                progress += f" on {evaluator.workers} workers"
+            if fitness_cache is not None:
+                progress += f", {fitness_cache.hits - cache_hits} birds cached"
+            steps, score, alive_curve = evaluator.steps, evaluator.score, evaluator.alive_curve
+        else:
+            course_seed = game.course_seed
+            steps = scheduler.run(game)
+            score, alive_curve = game.score, game.alive_curve
+            progress = f"{steps} frames"
+        elapsed = time.time() - generation_start
+
+        if metrics_log:
+            metrics_log.record(generation, genetic_algorithm.fitness, genetic_algorithm.genomes, elapsed,
+                               steps, score, alive_curve)
+
+        if replay_recorder:
+            replay_recorder.record(generation, genetic_algorithm.layer_sizes, genetic_algorithm.genomes,
+                                   genetic_algorithm.fitness, course_seed, steps or scheduler.max_steps)
+
+        if controller is not None:
+            progress += f", {len(genetic_algorithm.fitness)} birds, mutation rate {genetic_algorithm.mutation_rate:.3f}"
+
+        print(f"Generation {generation} complete: best fitness {genetic_algorithm.calculate_best_fitness():.1f}, "
+              f"{progress} in {elapsed:.3f}s")
+
+        # Save before evolving so the file holds the evaluated fitness scores
+        if save_file and generation == generations:
+            save_population_genomes(save_file, genetic_algorithm.layer_sizes, genetic_algorithm.genomes,
+                                    genetic_algorithm.fitness)
+            print(f"Population saved to {save_file}")
+
+        if checkpoint_writer:
+            checkpoint_writer.on_generation(generation, genetic_algorithm)
+
+        genetic_algorithm.evolve(elapsed=elapsed)
+        game.reset()
+
+        if stats_log:
+            stats_log.write(generation, game.stats)
+        game.stats.reset()
+
+    if evaluator:
+        evaluator.close()
+
+    print(f"Trained {generations} generations in {time.time() - start_time:.2f}s")
+    return genetic_algorithm
+
+def train_islands(generations, islands, interval, migrants, mutation_rate=0.1, scheduler=None,
+                  population_file=None, save_file=None, selection=SELECTION, elite_count=ELITE_COUNT, streams=None):
+    """Train with an island model of separate sub-populations, one process each.
+
+    A loaded population is split across the islands, and the saved one is
+    every island's last evaluated population put back together.
+    """
+    population = None
+    if population_file:
+        layer_sizes, genomes, _ = load_population_genomes(population_file)
+        population = (layer_sizes, genomes)
+        print(f"Loaded population from {population_file}")
+
+    start_time = time.time()
+
+    with IslandModel(islands, interval, migrants, mutation_rate, selection, elite_count,
+                     scheduler, streams, population) as model:
+        history = model.run(generations)
+
+        if save_file:
+            save_population_genomes(save_file, *model.population())
+            print(f"Population saved to {save_file}")
+
+    print(f"Trained {generations} generations on {islands} islands in {time.time() - start_time:.2f}s")
+    return history
@@ -1,9 +1,87 @@
+import os
 import json
 import numpy as np
 from bird import Bird
 from neural_network import NeuralNetwork
+from genome_io import save_genomes, load_genomes
+from delta import DELTA_SUFFIX, save_delta, load_delta
+from config import POPULATION_FILE, LEGACY_POPULATION_FILE
 
-def save_population(population, filename):
+def save_population(population, filename, dtype=np.float32):
+    """Save a list of birds in the format given by the file name, see save_population_genomes."""
+    if filename.endswith(".json"):
+        save_population_json(population, filename)
+        return
+
+    genomes = np.stack([bird.brain.flatten() for bird in population])
+    fitness = np.array([bird.fitness for bird in population], dtype=float)
+    save_population_genomes(filename, population[0].brain.layer_sizes, genomes, fitness, dtype)
+
+def save_population_genomes(filename, layer_sizes, genomes, fitness, dtype=np.float32):
+    """Save a population given as a (birds, parameters) genome matrix.
+
+    Files ending in .json are written in the JSON export format, files
+    ending in .gfd as a self-contained delta checkpoint, anything else as a
+    binary checkpoint. Only the JSON export creates per-bird objects.
+    """
+    if filename.endswith(".json"):
+        birds = []
+        for genome, score in zip(genomes, fitness):
+            bird = Bird(NeuralNetwork.from_flat(layer_sizes, genome), copy_brain=False)
+            bird.fitness = float(score)
+            birds.append(bird)
+        save_population_json(birds, filename)
+        return
+
+    # Written next to the file and moved over it, since genomes may be memory-mapped from it
+    temp_filename = filename + ".tmp"
+    if filename.endswith(DELTA_SUFFIX):
+        save_delta(temp_filename, layer_sizes, genomes, fitness, dtype=dtype)
+    else:
+        save_genomes(temp_filename, layer_sizes, genomes, fitness, dtype)
+    os.replace(temp_filename, filename)
+
+def load_population(filename):
+    """Load a population saved by save_population as a list of birds."""
+    if filename.endswith(".json"):
+        return load_population_json(filename)
+
+    layer_sizes, genomes, fitness = load_population_genomes(filename)
+    population = []
+
+    for genome, score in zip(genomes, fitness):
+        # The brains are views into the memory-mapped file, nothing is copied here
+        bird = Bird(NeuralNetwork.from_flat(layer_sizes, genome), copy_brain=False)
+        bird.fitness = float(score)
+        population.append(bird)
+
+    return population
+
+def load_population_genomes(filename):
+    """Load a population saved in any format as (layer_sizes, genomes, fitness).
+
+    Binary checkpoints are memory-mapped, so nothing is copied until the
+    genomes are read. Delta checkpoints are decoded into memory, with the
+    checkpoints they refer to.
+    """
+    if filename.endswith(".json"):
+        birds = load_population_json(filename)
+        return (birds[0].brain.layer_sizes, np.stack([bird.brain.flatten() for bird in birds]),
+                np.array([bird.fitness for bird in birds], dtype=float))
+    if filename.endswith(DELTA_SUFFIX):
+        return load_delta(filename)
+    return load_genomes(filename)
+
+def load_saved_population():
+    """Load the default population file, falling back to the legacy JSON file.
+
+    Returns (layer_sizes, genomes, fitness), see load_population_genomes.
+    """
+    if os.path.exists(POPULATION_FILE):
+        return load_population_genomes(POPULATION_FILE)
+    return load_population_genomes(LEGACY_POPULATION_FILE)
+
+def save_population_json(population, filename):
     """Save the current bird population to a JSON file."""
     data = {
         "birds": [
@@ -14,21 +92,20 @@ def save_population(population, filename):
             for bird in population
         ]
     }
-    
+
     with open(filename, 'w') as f:
         json.dump(data, f)
 
-def load_population(filename):
+def load_population_json(filename):
     """Load bird population from a JSON file."""
     with open(filename, 'r') as f:
         data = json.load(f)
-    
+
     population = []
-    
+
     for bird_data in data["birds"]:
-        bird = Bird()
+        bird = Bird(NeuralNetwork.from_dict(bird_data["brain"]), copy_brain=False)
         bird.fitness = bird_data["fitness"]
-        bird.brain = NeuralNetwork.from_dict(bird_data["brain"])
         population.append(bird)
-    
+
     return population
@@ -0,0 +1,291 @@
+import numpy as np
+from neural_network import NeuralNetwork
+from sensors import Sensors
+from config import HIDDEN_LAYERS, SCREEN_HEIGHT, PIPE_GAP, PIPE_WIDTH, PIPE_SPEED, BIRD_X, BIRD_SIZE, GRAVITY, JUMP_FORCE
+
+SURVIVAL_REWARD = 0.1  # Fitness per frame survived
+PIPE_REWARD = 5        # Fitness per pipe passed
+
+LAYER_SIZES = [Sensors().count] + HIDDEN_LAYERS + [1]  # Brain topology, one output decides whether to jump
+
+def array_property(name, array_name, cast):
+    """Attribute stored on the object until it is bound to a World, then read from the World's array."""
+    local_name = "_" + name
+
+    def get(self):
+        if self.world is None:
+            return getattr(self, local_name)
+        return cast(getattr(self.world, array_name)[self.index])
+
+    def set(self, value):
+        if self.world is None:
+            setattr(self, local_name, value)
+        else:
+            getattr(self.world, array_name)[self.index] = value
+
+    return property(get, set)
+
+class World:
+    """Structure-of-arrays state for all birds and pipes in a game.
+
+    Bird state lives in one array per attribute, indexed by population slot.
+    The indices of the living birds are kept compacted in active, so per-step
+    work only touches birds that are still flying; use kill() rather than
+    writing bird_alive directly so the two stay in sync.
+    Pipes live in a fixed-capacity ring buffer; since they spawn at the right
+    edge and all move at the same speed, the buffer is always sorted by x.
+
+    A world can fly several courses at once in separate lanes. Pipes are at
+    the same x in every course, so lanes only differ in their gap heights,
+    and each bird flies through the gaps of its own lane.
+    """
+
+    def __init__(self, bird_count=0, pipe_capacity=8, lanes=1, sensors=None):
+        self.resize_birds(bird_count)
+        self.sensors = sensors or Sensors()
+
+        # Brains of the population, one flattened network per row. genomes_changed
+        # is set when a single row is rewritten, so the game reloads its batched brains
+        self.layer_sizes = []
+        self.genomes = None
+        self.genomes_changed = False
+
+        self.pipe_x = np.zeros(pipe_capacity)
+        self.pipe_gaps = np.zeros((lanes, pipe_capacity))  # Gap height per lane
+        self.pipe_passed = np.zeros(pipe_capacity, dtype=bool)
+        self.pipe_head = 0
+        self.pipe_count = 0
+        self._pipe_views = [None] * pipe_capacity
+
+        # Final fitness of birds whose episode was looked up instead of flown, one sorted array per lane
+        self.ghost_fitness = None
+
+    def resize_birds(self, bird_count):
+        """Allocate bird arrays for a population of the given size."""
+        self.bird_y = np.zeros(bird_count)
+        self.bird_velocity = np.zeros(bird_count)
+        self.bird_alive = np.ones(bird_count, dtype=bool)
+        self.bird_fitness = np.zeros(bird_count)
+        self.bird_lane = np.zeros(bird_count, dtype=int)
+        self.active = np.arange(bird_count)
+
+    def reset_birds(self):
+        """Put every bird back at the start, alive and with no fitness."""
+        self.bird_y[:] = SCREEN_HEIGHT // 2
+        self.bird_velocity[:] = 0
+        self.bird_alive[:] = True
+        self.bird_fitness[:] = 0
+        self.active = np.arange(len(self.bird_alive))
+
+    def kill(self, indices):
+        """Mark birds as dead and drop them from the active set."""
+        self.bird_alive[indices] = False
+        self.active = self.active[self.bird_alive[self.active]]
+
+    def bind_birds(self, birds, layer_sizes, genomes):
+        """Move the state of each bird into the arrays and turn the birds into views."""
+        self.layer_sizes = list(layer_sizes)
+        self.genomes = genomes
+        self.genomes_changed = False
+
+        # Read everything before reallocating, the birds may already be views of this world
+        self.bird_y = np.array([bird.y for bird in birds], dtype=float)
+        self.bird_velocity = np.array([bird.velocity for bird in birds], dtype=float)
+        self.bird_alive = np.array([bird.alive for bird in birds], dtype=bool)
+        self.bird_fitness = np.array([bird.fitness for bird in birds], dtype=float)
+        self.bird_lane = np.zeros(len(birds), dtype=int)
+        self.active = np.flatnonzero(self.bird_alive)
+
+        for i, bird in enumerate(birds):
+            bird.bind(self, i)
+
+    def set_genome(self, index, genome):
+        """Replace the brain of one bird with a flattened network."""
+        self.genomes[index] = genome
+        self.genomes_changed = True
+
+    def brain(self, index):
+        """Neural network whose weights are views into row index of the genome matrix."""
+        return NeuralNetwork.from_flat(self.layer_sizes, self.genomes[index])
+
+    @property
+    def pipe_capacity(self):
+        return len(self.pipe_x)
+
+    @property
+    def lanes(self):
+        return len(self.pipe_gaps)
+
+    @property
+    def pipe_gap_y(self):
+        # Gap heights of the first lane, the only one unless several courses are flown
+        return self.pipe_gaps[0]
+
+    def set_ghosts(self, ghosts):
+        """Count birds that are not simulated as flying until their known final fitness is reached.
+
+        ghosts holds the final fitness of such birds, one array per lane, or
+        None for no ghosts. Birds flying together have the same fitness, so a
+        ghost is still in the air while the birds of its lane haven't earned
+        more than it ended with; that is all the scheduler needs to end the
+        episode at the same frame as if the ghosts had been flown.
+        """
+        self.ghost_fitness = None if ghosts is None else [np.sort(lane) for lane in ghosts]
+
+    def ghosts_flying(self):
+        """Number of ghosts still flying in every lane that has living birds."""
+        counts = np.zeros(self.lanes, dtype=int)
+        if self.ghost_fitness is None or len(self.active) == 0:
+            return counts
+
+        active = self.active
+        lanes, first = np.unique(self.bird_lane[active], return_index=True)
+        for lane, index in zip(lanes, active[first]):
+            ghosts = self.ghost_fitness[lane]
+            counts[lane] = len(ghosts) - np.searchsorted(ghosts, self.bird_fitness[index])
+        return counts
+
+    def lane_fitness(self):
+        """Fitness of the birds still flying in every lane, NaN for lanes where none are."""
+        fitness = np.full(self.lanes, np.nan)
+        active = self.active
+        fitness[self.bird_lane[active]] = self.bird_fitness[active]
+        return fitness
+
+    def set_lanes(self, lanes):
+        """Fly the given number of courses at once. Pipe gaps are cleared, so call this between episodes."""
+        if lanes != self.lanes:
+            self.pipe_gaps = np.zeros((lanes, self.pipe_capacity))
+
+    def pipe_slots(self):
+        """Ring buffer slots of the active pipes, ordered from left to right."""
+        return (self.pipe_head + np.arange(self.pipe_count)) % self.pipe_capacity
+
+    def pipe_view(self, slot):
+        """Pipe object that reads and writes the given ring buffer slot."""
+        if self._pipe_views[slot] is None:
+            # Imported here because pipe.py imports array_property from this module
+            from pipe import Pipe
+            pipe = Pipe(0, 0)
+            pipe.bind(self, slot)
+            self._pipe_views[slot] = pipe
+        return self._pipe_views[slot]
+
+    def add_pipe(self, x, gap_y):
+        """Append a pipe at the right end of the ring buffer and return its slot."""
+        if self.pipe_count == self.pipe_capacity:
+            self._grow_pipes()
+
+        slot = (self.pipe_head + self.pipe_count) % self.pipe_capacity
+        self.pipe_x[slot] = x
+        self.pipe_gaps[:, slot] = gap_y  # One gap height per lane, or the same for all
+        self.pipe_passed[slot] = False
+        self.pipe_count += 1
+        return slot
+
+    def clear_pipes(self):
+        self.pipe_head = 0
+        self.pipe_count = 0
+
+    def _grow_pipes(self):
+        # Unroll the ring into the front of a buffer twice the size
+        slots = self.pipe_slots()
+        capacity = self.pipe_capacity * 2
+
+        for name in ("pipe_x", "pipe_gaps", "pipe_passed"):
+            old = getattr(self, name)
+            new = np.zeros(old.shape[:-1] + (capacity,), dtype=old.dtype)
+            new[..., :self.pipe_count] = old[..., slots]
+            setattr(self, name, new)
+
+        self.pipe_head = 0
+        self._pipe_views = [None] * capacity
+
+    def move_pipes(self, delta_time):
+        """Scroll all pipes left and drop the ones that have left the screen."""
+        # Inactive slots move too, which is harmless and avoids gathering
+        self.pipe_x -= PIPE_SPEED * delta_time
+
+        # Off-screen pipes are always at the front of the ring
+        off_screen = np.count_nonzero(self.pipe_x[self.pipe_slots()] <= -PIPE_WIDTH)
+        self.pipe_head = (self.pipe_head + off_screen) % self.pipe_capacity
+        self.pipe_count -= off_screen
+
+    def pipes_ahead(self):
+        """Find the pipes that matter to the birds this step.
+
+        Every bird shares the same x, so this is one lookup for the whole
+        population. Returns the slot of the next pipe (None if there is none)
+        and the slots of the pipes the birds currently overlap horizontally.
+        """
+        slots = self.pipe_slots()
+        xs = self.pipe_x[slots]
+
+        # Pipes are sorted by x, so both ends of the range are binary searches
+        first = np.searchsorted(xs + PIPE_WIDTH, BIRD_X, side="right")
+        last = np.searchsorted(xs, BIRD_X + BIRD_SIZE, side="left")
+
+        next_slot = slots[first] if first < len(slots) else None
+        return next_slot, slots[first:last]
+
+    def pipes_after(self, next_slot, count):
+        """Slots of the next pipe and the count - 1 pipes behind it, None for pipes not spawned yet."""
+        position = (next_slot - self.pipe_head) % self.pipe_capacity
+        return [(next_slot + k) % self.pipe_capacity if position + k < self.pipe_count else None
+                for k in range(count)]
+
+    def gap_y(self, indices, slot):
+        """Gap height of a pipe as seen by the given birds: one value, or one per bird when flying in lanes."""
+        if self.lanes == 1:
+            return self.pipe_gaps[0, slot]
+        return self.pipe_gaps[self.bird_lane[indices], slot]
+
+    def sense(self, indices, next_slot):
+        """Neural network inputs for the given birds as one (birds, sensors.count) matrix."""
+        return self.sensors.sense(self, indices, next_slot)
+
+    def collide(self, indices, overlapping):
+        """Return a mask of which of the given birds hit the floor, ceiling or a pipe."""
+        y = self.bird_y[indices]
+        hit = (y <= 0) | (y >= SCREEN_HEIGHT - BIRD_SIZE)
+
+        if len(overlapping):
+            if self.lanes == 1:
+                gap_y = self.pipe_gaps[0, overlapping]
+            else:
+                gap_y = self.pipe_gaps[self.bird_lane[indices][:, None], overlapping]
+            top = y[:, None] < gap_y
+            bottom = y[:, None] + BIRD_SIZE > gap_y + PIPE_GAP
+            hit |= (top | bottom).any(axis=1)
+
+        return hit
+
+    def jump(self, indices):
+        self.bird_velocity[indices] = JUMP_FORCE
+
+    def move_birds(self, delta_time):
+        """Apply gravity to every living bird."""
+        active = self.active
+        self.bird_velocity[active] += GRAVITY * delta_time
+        self.bird_y[active] += self.bird_velocity[active] * delta_time
+
+    def reward(self, survivors):
+        """Reward surviving birds for the frame and for any pipe they just passed.
+
+        Returns the number of pipes passed this frame.
+        """
+        self.bird_fitness[survivors] += SURVIVAL_REWARD
+        if len(survivors) == 0:
+            return 0
+
+        # All birds share the same x, so a pipe is passed by everyone at once.
+        # Pipes move several pixels per frame, so test for the center having
+        # crossed the birds rather than for it being inside a narrow window.
+        slots = self.pipe_slots()
+        centers = self.pipe_x[slots] + PIPE_WIDTH / 2
+        passing = slots[(centers < BIRD_X) & ~self.pipe_passed[slots]]
+
+        if len(passing):
+            self.bird_fitness[survivors] += PIPE_REWARD * len(passing)
+            self.pipe_passed[passing] = True
+        return len(passing)